@@ -1,40 +1,78 @@
 # Importar bibliotecas
+import os
 import numpy as np
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
 import torch
 import torch.nn as nn
 import torch.optim as optim
 
+from utils import cpu_supports_bf16, load_or_generate_arrays
+
+# Dispositivo de execução: GPU quando disponível, senão CPU
+device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+
 # ---------- 1️⃣ Gerar retina 3D simulada ----------
 # Simulação simples de células ganglionares na retina
 num_cells = 500
-# posições x, y, z
-x = np.random.uniform(-5, 5, num_cells)
-y = np.random.uniform(-5, 5, num_cells)
-z = np.random.uniform(-0.5, 0.5, num_cells)
-# status: 1 = vivo, 0 = morto
-status = np.random.choice([0,1], size=num_cells, p=[0.2,0.8])
+seed = 42
+bounds_low = [-5, -5, -0.5]
+bounds_high = [5, 5, 0.5]
+status_probs = [0.2, 0.8]  # P(morto), P(vivo)
+INIT_STATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'init_state.npz')
+
+def generate_initial_state():
+    rng = np.random.default_rng(seed)
+    # posições (num_cells, 3) em uma única chamada ao gerador, já em float32
+    low = np.array(bounds_low, dtype=np.float32)
+    high = np.array(bounds_high, dtype=np.float32)
+    pts = low + rng.random((num_cells, 3), dtype=np.float32) * (high - low)
+    # status: 1 = vivo, 0 = morto
+    status = rng.choice([0,1], size=num_cells, p=status_probs)
+    return {'pts': pts, 'status': status}
+
+# Estado inicial salvo em data/init_state.npz na primeira execução e
+# reaproveitado nas seguintes; é regerado se os parâmetros mudarem
+init_state = load_or_generate_arrays(
+    INIT_STATE_PATH,
+    generate_initial_state,
+    params={'num_cells': num_cells, 'seed': seed, 'bounds_low': bounds_low,
+            'bounds_high': bounds_high, 'status_probs': status_probs},
+)
+pts, status = init_state['pts'], init_state['status']
+assert pts.shape[0] == num_cells, "Estado inicial com número de células incorreto"
+x, y, z = pts.T
 
-# Visualização 3D
-fig = plt.figure(figsize=(8,6))
-ax = fig.add_subplot(111, projection='3d')
-ax.scatter(x[status==1], y[status==1], z[status==1], c='green', label='Vivo')
-ax.scatter(x[status==0], y[status==0], z[status==0], c='red', label='Morto')
-ax.set_xlabel('X')
-ax.set_ylabel('Y')
-ax.set_zlabel('Z')
-ax.set_title('Retina 3D Simulada - Células Ganglionares')
-ax.legend()
-plt.show()
+# Visualização 3D (matplotlib só é importado se houver gráfico; NO_PLOT=1 desativa)
+if __name__ == '__main__' and not os.environ.get('NO_PLOT'):
+    import matplotlib
+    import matplotlib.pyplot as plt
+    from matplotlib.lines import Line2D
+
+    # A projeção '3d' é registrada automaticamente pelo matplotlib (>= 3.2)
+    plt.style.use('fast')
+    matplotlib.rcParams['path.simplify_threshold'] = 1.0
+
+    fig = plt.figure(figsize=(8,6))
+    ax = fig.add_subplot(111, projection='3d')
+    # Uma única chamada de scatter com a cor de cada célula definida pelo status
+    colors = np.where(status == 1, '#00cc00', '#cc0000')
+    ax.scatter(x, y, z, c=colors, s=6, depthshade=False)
+    ax.set_xlabel('X')
+    ax.set_ylabel('Y')
+    ax.set_zlabel('Z')
+    ax.set_title('Retina 3D Simulada - Células Ganglionares')
+    ax.legend(handles=[
+        Line2D([], [], marker='o', linestyle='', color='#00cc00', label='Vivo'),
+        Line2D([], [], marker='o', linestyle='', color='#cc0000', label='Morto'),
+    ])
+    plt.show()
 
 # ---------- 2️⃣ Preparar dados para IA ----------
-X = np.vstack([x, y, z]).T
-y_labels = status
+X = pts
+y_labels = status.astype(np.float32)
 
-# Converter para tensores do PyTorch
-X_tensor = torch.tensor(X, dtype=torch.float32)
-y_tensor = torch.tensor(y_labels, dtype=torch.float32).unsqueeze(1)
+# Converter para tensores do PyTorch sem cópia (dataset inteiro cabe em um único batch)
+X_tensor = torch.from_numpy(X).to(device)
+y_tensor = torch.from_numpy(y_labels).unsqueeze(1).to(device)
 
 # ---------- 3️⃣ Criar IA simples (MLP) ----------
 class SimpleNet(nn.Module):
@@ -43,32 +81,47 @@ class SimpleNet(nn.Module):
         self.fc1 = nn.Linear(3, 16)
         self.fc2 = nn.Linear(16, 16)
         self.fc3 = nn.Linear(16, 1)
-        self.sigmoid = nn.Sigmoid()
         
     def forward(self, x):
         x = torch.relu(self.fc1(x))
         x = torch.relu(self.fc2(x))
-        x = self.fc3(x)
-        return self.sigmoid(x)
+        # Retorna logits: a sigmoid fica fundida na loss (BCEWithLogitsLoss)
+        return self.fc3(x)
 
-model = SimpleNet()
-criterion = nn.BCELoss()
+model = SimpleNet().to(device)
+# Compilar o modelo uma única vez na GPU (o shape da entrada nunca muda):
+# torch.compile funde as operações elementares e reduz lançamentos de kernel.
+# Na CPU o ganho é desprezível e o modo eager é mantido.
+if device.type == 'cuda' and hasattr(torch, 'compile'):
+    model = torch.compile(model, mode='reduce-overhead', fullgraph=True)
+criterion = nn.BCEWithLogitsLoss()
 optimizer = optim.Adam(model.parameters(), lr=0.01)
 
+# Precisão mista: pesos ficam em float32, mas as multiplicações de matriz
+# rodam em bfloat16 via autocast. bf16 tem a mesma faixa do float32, então
+# não é preciso GradScaler. Só ativa onde há suporte nativo (GPU Ampere+ ou
+# CPU com AVX512-BF16/AMX); caso contrário bf16 seria emulado e mais lento.
+if device.type == 'cuda':
+    use_amp = torch.cuda.is_bf16_supported()
+else:
+    use_amp = cpu_supports_bf16()
+
 # ---------- 4️⃣ Treinar IA ----------
 epochs = 200
 for epoch in range(epochs):
-    optimizer.zero_grad()
-    outputs = model(X_tensor)
-    loss = criterion(outputs, y_tensor)
+    optimizer.zero_grad(set_to_none=True)
+    with torch.autocast(device_type=device.type, dtype=torch.bfloat16, enabled=use_amp):
+        outputs = model(X_tensor)
+        loss = criterion(outputs, y_tensor)
     loss.backward()
     optimizer.step()
     
+    # .item() força sincronização com a GPU: só no intervalo de log
     if (epoch+1) % 50 == 0:
         print(f"Epoch [{epoch+1}/{epochs}], Loss: {loss.item():.4f}")
 
 # ---------- 5️⃣ Testar IA ----------
-with torch.no_grad():
-    predicted = model(X_tensor).round()
+with torch.inference_mode(), torch.autocast(device_type=device.type, dtype=torch.bfloat16, enabled=use_amp):
+    predicted = torch.sigmoid(model(X_tensor).float()).round()
 accuracy = (predicted.eq(y_tensor).sum().item()) / num_cells
 print(f"Accuracy na retina simulada: {accuracy*100:.2f}%")
@@ -1,14 +1,23 @@
 """
 Script Principal - Demonstração Comparativa de Cenários de Glaucoma.
 
-Executa três cenários em sequência:
+No modo padrão (--mode comparative) executa três cenários em paralelo
+(um processo por cenário):
   1. Paciente saudável (IOP normal)
   2. Glaucoma moderado sem tratamento
   3. Glaucoma moderado com tratamento (iniciado no meio da simulação)
+
+Com --mode single executa apenas um cenário com a IOP inicial da
+configuração.
 """
 
+import argparse
 import os
 import sys
+from multiprocessing import get_context
+from typing import Any, Dict, List, Optional
+
+import numpy as np
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
@@ -19,8 +28,6 @@ from scripts.config import (
 )
 from scripts.retina import RetinaSim
 from scripts.simulation import GlaucomaSimulator
-from scripts.ai_model import GlaucomaPredictor, SimplePredictor, TENSORFLOW_AVAILABLE
-from scripts.visualization import RetinaVisualizer
 from utils import print_banner, save_simulation_results, create_directories_if_not_exist
 
 
@@ -29,6 +36,9 @@ from utils import print_banner, save_simulation_results, create_directories_if_n
 NUM_STEPS = 200
 LOG_INTERVAL = 50
 TREATMENT_STEP = 100  # Passo em que o tratamento é iniciado no cenário 3
+NUM_WORKERS = 3  # Processos paralelos (um por cenário)
+THREADS_PER_WORKER = "2"  # Threads BLAS por processo (evita oversubscription)
+RESULTS_FILENAME = "all_scenarios.json"  # Sumários de todos os cenários
 # ---------------------------------------------------------------------------
 
 
@@ -51,89 +61,222 @@ def run_scenario(
 
     Returns:
         tuple: (GlaucomaSimulator, RetinaSim)
-    """
-    import numpy as np
-    np.random.seed(42 + seed_offset)
 
-    retina = RetinaSim()
-    sim = GlaucomaSimulator(retina, initial_iop=initial_iop)
+    Note:
+        Os argumentos e o retorno são picklable, permitindo executar a
+        função em processos separados via multiprocessing.
+    """
+    # Gerador próprio por cenário (sem estado global compartilhado)
+    rng = np.random.default_rng(42 + seed_offset)
+    retina = RetinaSim(rng=rng)
+    sim = GlaucomaSimulator(retina, initial_iop=initial_iop, rng=rng, num_steps=num_steps)
 
     print(f"\n  [{label}] IOP inicial: {initial_iop:.1f} mmHg")
 
-    for step in range(num_steps):
-        result = sim.step()
-
-        if treatment_at and step == treatment_at:
-            sim.apply_treatment(effectiveness=0.85)
-            print(f"  [{label}] Tratamento iniciado no passo {step}  (IOP: {sim.current_iop:.1f} mmHg)")
+    def log_checkpoints(results):
+        for result in results:
+            if result["step"] % LOG_INTERVAL == 0:
+                print(
+                    f"  [{label}] Step {result['step']}: "
+                    f"IOP={result['iop']:.1f} mmHg | "
+                    f"Vivas={result['total_alive_cells']:,} | "
+                    f"Mortalidade={result['mortality_rate']:.2%}"
+                )
+
+    # O tratamento entra após o passo treatment_at: a simulação roda em no
+    # máximo dois blocos vetorizados, sem despacho Python por passo.
+    first_block = min(treatment_at + 1, num_steps) if treatment_at else num_steps
+    log_checkpoints(
+        sim.run_simulation(first_block, log_interval=LOG_INTERVAL, vectorized=True, verbose=False)
+    )
 
-        if (step + 1) % LOG_INTERVAL == 0:
-            print(
-                f"  [{label}] Step {step + 1}: "
-                f"IOP={result['iop']:.1f} mmHg | "
-                f"Vivas={result['total_alive_cells']:,} | "
-                f"Mortalidade={result['mortality_rate']:.2%}"
+    if first_block < num_steps:
+        sim.apply_treatment(effectiveness=0.85)
+        print(f"  [{label}] Tratamento iniciado no passo {treatment_at}  (IOP: {sim.current_iop:.1f} mmHg)")
+        log_checkpoints(
+            sim.run_simulation(
+                num_steps - first_block, log_interval=LOG_INTERVAL, vectorized=True, verbose=False
             )
+        )
 
     return sim, retina
 
 
-def main():
-    """Função principal do projeto."""
+def build_scenarios(mode: str, config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Monta a lista de cenários a executar.
 
-    print_banner("SIMULADOR DE RETINA 3D COM GLAUCOMA")
+    Cada cenário é um dicionário com os campos label, initial_iop,
+    treatment_at, seed_offset, slug (sufixo dos arquivos de gráficos
+    detalhados; None = sem gráficos detalhados) e title.
 
-    config = get_config()
-    results_dir = config["directories"]["results"]
-    create_directories_if_not_exist([results_dir])
+    Args:
+        mode (str): 'comparative' (três cenários) ou 'single' (um cenário
+            com a IOP inicial da configuração).
+        config (Dict[str, Any]): Configuração do projeto (get_config()).
 
-    # ========================================================================
-    # 1. CONFIGURAÇÃO
-    # ========================================================================
-    print("\n1. Configuração carregada")
-    print(f"   Total de células por simulação: {config['retina']['total_cells']:,}")
-    print(f"   Passos por simulação: {NUM_STEPS}")
+    Returns:
+        List[Dict[str, Any]]: Especificações dos cenários.
+    """
+    if mode == "single":
+        return [{
+            "label": "Simulação Padrão",
+            "initial_iop": config["physics"]["initial_iop"],
+            "treatment_at": 0,
+            "seed_offset": 0,
+            "slug": "padrao",
+            "title": "Simulação Padrão",
+        }]
+
+    return [
+        {
+            "label": SCENARIO_NORMAL["label"],
+            "initial_iop": SCENARIO_NORMAL["initial_iop"],
+            "treatment_at": 0,
+            "seed_offset": 0,
+            "slug": None,
+            "title": SCENARIO_NORMAL["label"],
+        },
+        {
+            "label": SCENARIO_GLAUCOMA["label"],
+            "initial_iop": SCENARIO_GLAUCOMA["initial_iop"],
+            "treatment_at": 0,
+            "seed_offset": 1,
+            "slug": "glaucoma",
+            "title": "Glaucoma Sem Tratamento",
+        },
+        {
+            "label": "Glaucoma + Tratamento",
+            "initial_iop": SCENARIO_GLAUCOMA["initial_iop"],
+            "treatment_at": TREATMENT_STEP,
+            "seed_offset": 2,
+            "slug": "treated",
+            "title": "Glaucoma Com Tratamento",
+        },
+    ]
+
+
+def _run_scenarios(scenarios: List[Dict[str, Any]]) -> List[tuple]:
+    """
+    Executa os cenários, em paralelo quando há mais de um.
+
+    Args:
+        scenarios (List[Dict[str, Any]]): Especificações dos cenários.
+
+    Returns:
+        List[tuple]: (GlaucomaSimulator, RetinaSim) de cada cenário.
+    """
+    scenario_args = [
+        (sc["label"], sc["initial_iop"], NUM_STEPS, sc["treatment_at"], sc["seed_offset"])
+        for sc in scenarios
+    ]
+    if len(scenario_args) == 1:
+        return [run_scenario(*scenario_args[0])]
+
+    # Cenários independentes: executados em paralelo. 'spawn' é mais seguro
+    # que 'fork' com NumPy/BLAS; limitar threads BLAS por processo.
+    # Os workers herdam o ambiente ao serem criados (antes de importar o
+    # NumPy), então o limite vale só durante a criação da Pool e o processo
+    # principal (ex.: treino do TensorFlow) mantém todas as threads.
+    previous = os.environ.get("OMP_NUM_THREADS")
+    os.environ.setdefault("OMP_NUM_THREADS", THREADS_PER_WORKER)
+    try:
+        pool = get_context("spawn").Pool(min(NUM_WORKERS, len(scenario_args)))
+    finally:
+        if previous is None:
+            del os.environ["OMP_NUM_THREADS"]
+    with pool:
+        return pool.starmap(run_scenario, scenario_args)
+
+
+def _run_ai_predictions(
+    config: Dict[str, Any], labels: List[str], summaries: List[Dict[str, Any]]
+) -> None:
+    """
+    Treina o modelo de IA e imprime as predições para o estado final.
+
+    Args:
+        config (Dict[str, Any]): Configuração do projeto.
+        labels (List[str]): Rótulos dos cenários.
+        summaries (List[Dict[str, Any]]): Sumários correspondentes.
+    """
+    # Import tardio: TensorFlow só é carregado quando a IA é usada
+    from scripts.ai_model import GlaucomaPredictor, SimplePredictor, TENSORFLOW_AVAILABLE
+
+    if TENSORFLOW_AVAILABLE:
+        try:
+            predictor = GlaucomaPredictor()
+            predictor.config.epochs = 10
+            predictor.train(use_synthetic=True)
+            model_path = os.path.join(config["directories"]["models"], "glaucoma_model.keras")
+            predictor.save_model(model_path)
+            print(f"   ✓ Modelo treinado e salvo em models/")
+        except Exception as e:
+            print(f"   ⚠ Erro no treino: {e} — usando SimplePredictor")
+            predictor = SimplePredictor()
+    else:
+        predictor = SimplePredictor()
+
+    print("\n   Predições para IOP final de cada cenário:")
+    print(f"\n   {'Cenário':<30} {'IOP':>6} {'Progressão':>12} {'Vitalidade':>12} {'Risco':>8}")
+    print(f"   {'-'*30} {'-'*6} {'-'*12} {'-'*12} {'-'*8}")
+    # Uma única chamada ao modelo para todos os cenários
+    iops = np.array([s["final_iop"] for s in summaries])
+    morts = np.array([s["final_mortality_rate"] for s in summaries])
+    preds = predictor.predict_from_iop_batch(iops, morts)
+    for i, label in enumerate(labels):
+        print(
+            f"   {label:<30} {iops[i]:>5.1f}  "
+            f"{preds['glaucoma_progression'][i]:>11.1%}  "
+            f"{preds['cell_vitality'][i]:>11.1%}  "
+            f"{preds['risk_level'][i]:>7.1%}"
+        )
+
+
+def _run_and_save(
+    scenarios: List[Dict[str, Any]],
+    results_dir: str,
+    save_json: bool = True,
+    config: Optional[Dict[str, Any]] = None,
+    no_ai: bool = False,
+) -> List[str]:
+    """
+    Executa os cenários, imprime o sumário e salva gráficos e resultados.
+
+    Args:
+        scenarios (List[Dict[str, Any]]): Especificações (build_scenarios()).
+        results_dir (str): Diretório de saída.
+        save_json (bool): Se True, salva os sumários de todos os cenários
+            em um único arquivo JSON (RESULTS_FILENAME).
+        config (Optional[Dict[str, Any]]): Configuração do projeto.
+            Se None, usa get_config().
+        no_ai (bool): Se True, pula a seção do modelo de IA.
+
+    Returns:
+        List[str]: Nomes dos gráficos salvos.
+    """
+    config = config or get_config()
 
     # ========================================================================
-    # 2. EXECUTAR OS 3 CENÁRIOS
+    # 2. EXECUTAR OS CENÁRIOS
     # ========================================================================
     print(f"\n2. Executando simulações ({NUM_STEPS} passos cada)...")
 
-    sim_normal, retina_normal = run_scenario(
-        label=SCENARIO_NORMAL["label"],
-        initial_iop=SCENARIO_NORMAL["initial_iop"],
-        num_steps=NUM_STEPS,
-        seed_offset=0,
-    )
-
-    sim_glaucoma, retina_glaucoma = run_scenario(
-        label=SCENARIO_GLAUCOMA["label"],
-        initial_iop=SCENARIO_GLAUCOMA["initial_iop"],
-        num_steps=NUM_STEPS,
-        seed_offset=1,
-    )
-
-    sim_treated, retina_treated = run_scenario(
-        label="Glaucoma + Tratamento",
-        initial_iop=SCENARIO_GLAUCOMA["initial_iop"],
-        num_steps=NUM_STEPS,
-        treatment_at=TREATMENT_STEP,
-        seed_offset=2,
-    )
+    results = _run_scenarios(scenarios)
+    simulators = [sim for sim, _ in results]
+    retinas = [retina for _, retina in results]
+    labels = [sc["label"] for sc in scenarios]
+    # Sumários calculados uma única vez e reutilizados nas seções seguintes
+    summaries = [sim.get_summary() for sim in simulators]
 
     # ========================================================================
-    # 3. SUMÁRIO COMPARATIVO
+    # 3. SUMÁRIO
     # ========================================================================
     print("\n3. Sumário Comparativo")
     print(f"   {'Cenário':<30} {'IOP Final':>10} {'Mortalidade':>12} {'Saúde Média':>12}")
     print(f"   {'-'*30} {'-'*10} {'-'*12} {'-'*12}")
 
-    for label, sim in [
-        (SCENARIO_NORMAL["label"], sim_normal),
-        (SCENARIO_GLAUCOMA["label"], sim_glaucoma),
-        ("Glaucoma + Tratamento", sim_treated),
-    ]:
-        s = sim.get_summary()
+    for label, s in zip(labels, summaries):
         print(
             f"   {label:<30} "
             f"{s['final_iop']:>9.1f}  "
@@ -144,79 +287,117 @@ def main():
     # ========================================================================
     # 4. MODELO DE IA
     # ========================================================================
-    print("\n4. Modelo de IA...")
-
-    if TENSORFLOW_AVAILABLE:
-        try:
-            predictor = GlaucomaPredictor()
-            predictor.config.epochs = 10
-            predictor.train(use_synthetic=True)
-            model_path = os.path.join(config["directories"]["models"], "glaucoma_model.keras")
-            predictor.save_model(model_path)
-            print(f"   ✓ Modelo treinado e salvo em models/")
-        except Exception as e:
-            print(f"   ⚠ Erro no treino: {e} — usando SimplePredictor")
-            predictor = SimplePredictor()
+    if no_ai:
+        print("\n4. Modelo de IA... (ignorado: --no-ai)")
     else:
-        predictor = SimplePredictor()
-
-    print("\n   Predições para IOP final de cada cenário:")
-    print(f"\n   {'Cenário':<30} {'IOP':>6} {'Progressão':>12} {'Vitalidade':>12} {'Risco':>8}")
-    print(f"   {'-'*30} {'-'*6} {'-'*12} {'-'*12} {'-'*8}")
-    for label, sim in [
-        (SCENARIO_NORMAL["label"], sim_normal),
-        (SCENARIO_GLAUCOMA["label"], sim_glaucoma),
-        ("Glaucoma + Tratamento", sim_treated),
-    ]:
-        s = sim.get_summary()
-        iop = s["final_iop"]
-        mort = s["final_mortality_rate"]
-        pred = predictor.predict_from_iop(iop, mort) if hasattr(predictor, "predict_from_iop") else {}
-        if pred:
-            print(
-                f"   {label:<30} {iop:>5.1f}  "
-                f"{pred['glaucoma_progression']:>11.1%}  "
-                f"{pred['cell_vitality']:>11.1%}  "
-                f"{pred['risk_level']:>7.1%}"
-            )
+        print("\n4. Modelo de IA...")
+        _run_ai_predictions(config, labels, summaries)
 
     # ========================================================================
     # 5. VISUALIZAÇÕES
     # ========================================================================
     print("\n5. Gerando visualizações...")
 
+    # Import tardio: matplotlib só é carregado quando há gráficos a gerar
+    import matplotlib
+
+    matplotlib.use("Agg")  # Backend sem interface: figuras apenas salvas em arquivo
+    matplotlib.rcParams["path.simplify_threshold"] = 1.0
+    from scripts.visualization import RetinaVisualizer
+
     visualizer = RetinaVisualizer()
-    saved = []
-
-    simulators = [sim_normal, sim_glaucoma, sim_treated]
-    retinas = [retina_normal, retina_glaucoma, retina_treated]
-    labels = [SCENARIO_NORMAL["label"], SCENARIO_GLAUCOMA["label"], "Glaucoma + Tratamento"]
-
-    def save(fig, name):
-        if fig:
-            path = os.path.join(results_dir, name)
-            visualizer.save_figure(fig, path)
-            saved.append(name)
-
-    save(visualizer.plot_comparison_scenarios(simulators, labels), "comparison_iop_mortality.png")
-    save(visualizer.plot_cell_survival_comparison(simulators, retinas, labels), "comparison_cell_survival.png")
-    save(visualizer.plot_retina_3d(retina_glaucoma, title="Retina 3D — Glaucoma Moderado"), "retina_3d_glaucoma.png")
-    save(visualizer.plot_retina_3d(retina_treated, title="Retina 3D — Com Tratamento"), "retina_3d_treated.png")
-    save(visualizer.plot_timeline(sim_glaucoma, show_metrics=["iop", "mortality_rate"],
-                                  title="Evolução — Glaucoma Sem Tratamento"), "timeline_glaucoma.png")
-    save(visualizer.plot_timeline(sim_treated, show_metrics=["iop", "mortality_rate"],
-                                  title="Evolução — Glaucoma Com Tratamento"), "timeline_treated.png")
-    save(visualizer.plot_cell_type_distribution(retina_glaucoma), "cell_distribution_glaucoma.png")
+
+    figures = []
+    if len(scenarios) > 1:
+        figures += [
+            (visualizer.plot_comparison_scenarios(simulators, labels), "comparison_iop_mortality.png"),
+            (visualizer.plot_cell_survival_comparison(simulators, retinas, labels), "comparison_cell_survival.png"),
+        ]
+    detailed = [(sc, sim, retina) for sc, sim, retina in zip(scenarios, simulators, retinas) if sc["slug"]]
+    for sc, sim, retina in detailed:
+        figures.append(
+            (visualizer.plot_retina_3d(retina, title=f"Retina 3D — {sc['title']}"), f"retina_3d_{sc['slug']}.png")
+        )
+    for sc, sim, retina in detailed:
+        figures.append(
+            (visualizer.plot_timeline(sim, show_metrics=["iop", "mortality_rate"],
+                                      title=f"Evolução — {sc['title']}"), f"timeline_{sc['slug']}.png")
+        )
+    if detailed:
+        sc, _, retina = detailed[0]
+        figures.append((visualizer.plot_cell_type_distribution(retina), f"cell_distribution_{sc['slug']}.png"))
+    figures = [(fig, name) for fig, name in figures if fig]
+
+    # Salvamento sequencial: o matplotlib não é thread-safe (estado global,
+    # cache de fontes), então as figuras não são salvas em threads
+    for fig, name in figures:
+        visualizer.save_figure(fig, os.path.join(results_dir, name))
+    saved = [name for _, name in figures]
 
     print(f"\n   {len(saved)} gráfico(s) salvos em results/")
 
     # ========================================================================
     # 6. SALVAR RESULTADOS JSON
     # ========================================================================
-    print("\n6. Salvando resultados JSON...")
-    for label, sim in zip(labels, simulators):
-        filename = label.lower().replace(" ", "_").replace("+", "com") + ".json"
-        save_simulation_results(sim.get_summary(), os.path.join(results_dir, filename))
+    if save_json:
+        print("\n6. Salvando resultados JSON...")
+        # Um único dump {rótulo: sumário} para todos os cenários
+        all_results = dict(zip(labels, summaries))
+        results_path = os.path.join(results_dir, RESULTS_FILENAME)
+        save_simulation_results(all_results, results_path)
+
+    return saved
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    Lê os argumentos de linha de comando.
+
+    Args:
+        argv (Optional[List[str]]): Argumentos a interpretar. Se None, usa sys.argv.
+
+    Returns:
+        argparse.Namespace: Argumentos interpretados.
+    """
+    parser = argparse.ArgumentParser(description="Simulador de retina 3D com glaucoma")
+    parser.add_argument(
+        "--mode",
+        choices=["single", "comparative"],
+        default="comparative",
+        help="'comparative' executa os três cenários; 'single' executa um só",
+    )
+    parser.add_argument(
+        "--no-ai",
+        action="store_true",
+        help="não importa o TensorFlow nem treina o modelo de IA",
+    )
+    return parser.parse_args(argv)
+
+
+def main(mode: str = "comparative", no_ai: bool = False):
+    """
+    Função principal do projeto.
+
+    Args:
+        mode (str): 'comparative' (três cenários) ou 'single' (um cenário).
+        no_ai (bool): Se True, pula a seção do modelo de IA.
+    """
+
+    print_banner("SIMULADOR DE RETINA 3D COM GLAUCOMA")
+
+    config = get_config()
+    results_dir = config["directories"]["results"]
+    create_directories_if_not_exist([results_dir])
+
+    # ========================================================================
+    # 1. CONFIGURAÇÃO
+    # ========================================================================
+    print("\n1. Configuração carregada")
+    print(f"   Total de células por simulação: {config['retina']['total_cells']:,}")
+    print(f"   Passos por simulação: {NUM_STEPS}")
+
+    scenarios = build_scenarios(mode, config)
+    saved = _run_and_save(scenarios, results_dir, config=config, no_ai=no_ai)
 
     # ========================================================================
     # CONCLUSÃO
@@ -233,4 +414,5 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(mode=args.mode, no_ai=args.no_ai)
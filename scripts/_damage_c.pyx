@@ -0,0 +1,45 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Kernel de dano em Cython (opcional).
+
+Alternativa compilada a kernels.apply_damage para ambientes sem Numba.
+Compilar a partir da raiz do projeto com:
+
+    cythonize -i scripts/_damage_c.pyx
+"""
+
+from cython cimport floating
+
+
+def apply_damage_c(
+    floating[::1] health,
+    unsigned char[::1] alive,
+    Py_ssize_t[::1] chosen,
+    double[::1] damages,
+):
+    """
+    Aplica dano às células escolhidas, modificando os arrays in-place.
+
+    Args:
+        health: Saúde de todas as células (float32 ou float64).
+        alive: Máscara de células vivas, vista como uint8.
+        chosen: Índices das células que recebem dano (intp).
+        damages: Dano aplicado a cada célula escolhida (float64).
+
+    Returns:
+        int: Número de células que morreram.
+    """
+    cdef Py_ssize_t k, i
+    cdef double h
+    cdef Py_ssize_t killed = 0
+    with nogil:
+        for k in range(chosen.shape[0]):
+            i = chosen[k]
+            h = health[i] - damages[k]
+            if h <= 0.0:
+                h = 0.0
+                if alive[i]:
+                    alive[i] = 0
+                    killed += 1
+            health[i] = <floating>h
+    return killed
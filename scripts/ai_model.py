@@ -5,11 +5,15 @@ Este módulo implementa um modelo de rede neural para prever a progressão
 do glaucoma e o prognóstico baseado em dados da simulação.
 """
 
+import os
+import shutil
+import subprocess
 import numpy as np
 from typing import Tuple, List, Optional, Dict
 from dataclasses import dataclass
 
 try:
+    import tensorflow as tf
     from tensorflow import keras
     from tensorflow.keras import layers
     TENSORFLOW_AVAILABLE = True
@@ -21,11 +25,14 @@ from scripts.config import (
     MODEL_INPUT_SIZE,
     MODEL_HIDDEN_LAYERS,
     MODEL_OUTPUT_SIZE,
+    MODEL_PRECISION,
     BATCH_SIZE,
     LEARNING_RATE,
     EPOCHS,
     TRAIN_TEST_SPLIT,
 )
+from scripts.kernels import iop_scores
+from utils import cpu_supports_bf16
 
 
 @dataclass
@@ -38,6 +45,7 @@ class ModelConfig:
     batch_size: int = BATCH_SIZE
     learning_rate: float = LEARNING_RATE
     epochs: int = EPOCHS
+    precision: str = MODEL_PRECISION
 
     def __post_init__(self):
         """Inicializa valores padrão se não fornecidos."""
@@ -45,6 +53,29 @@ class ModelConfig:
             self.hidden_layers = MODEL_HIDDEN_LAYERS
 
 
+def resolve_precision_policy(precision: str = "auto") -> str:
+    """
+    Resolve a política de precisão mista das camadas ocultas.
+    
+    Com "auto", usa mixed_float16 em GPU, mixed_bfloat16 em CPU com suporte
+    nativo a bfloat16 e float32 nos demais casos (onde a precisão reduzida
+    seria emulada e mais lenta).
+    
+    Args:
+        precision (str): "auto" ou o nome de uma política Keras.
+    
+    Returns:
+        str: Nome da política Keras a usar.
+    """
+    if precision != "auto":
+        return precision
+    if TENSORFLOW_AVAILABLE and tf.config.list_physical_devices("GPU"):
+        return "mixed_float16"
+    if cpu_supports_bf16():
+        return "mixed_bfloat16"
+    return "float32"
+
+
 class GlaucomaPredictor:
     """
     Modelo de predição de glaucoma usando rede neural.
@@ -53,22 +84,36 @@ class GlaucomaPredictor:
     a progressão do glaucoma baseado em características da simulação.
     """
 
-    def __init__(self, config: Optional[ModelConfig] = None):
+    def __init__(
+        self,
+        config: Optional[ModelConfig] = None,
+        rng: Optional[np.random.Generator] = None,
+    ):
         """
         Inicializa o preditor de glaucoma.
         
         Args:
             config (Optional[ModelConfig]): Configuração do modelo.
                 Se None, usa valores padrão.
+            rng (Optional[np.random.Generator]): Gerador de números aleatórios
+                para os dados sintéticos. Se None, cria um novo.
         """
         self.config = config or ModelConfig()
+        self._rng = rng if rng is not None else np.random.default_rng()
         self.model = None
+        self.inference_model = None
         self.history = None
         self.input_scaler = None
         self.output_scaler = None
+        self._infer = None
+        self._predict_scalars = None
+        self._tflite = None
 
         if TENSORFLOW_AVAILABLE:
+            # Entrada de uma amostra reutilizada entre chamadas (caminho TFLite)
+            self._iop_buffer = np.zeros((1, self.config.input_size), dtype=np.float32)
             self._build_model()
+        self._bind_backend()
 
     def _build_model(self) -> None:
         """
@@ -79,11 +124,17 @@ class GlaucomaPredictor:
         - Camadas ocultas: com ativação ReLU
         - Camada de saída: output_size com ativação sigmoid (probabilidades)
         - Dropout para regularização
+        
+        As camadas ocultas usam a política de precisão mista resolvida por
+        resolve_precision_policy; a camada de saída fica em float32 para
+        preservar a estabilidade numérica da loss.
         """
         if not TENSORFLOW_AVAILABLE:
             print("Erro: TensorFlow não está disponível para construir o modelo.")
             return
 
+        policy = resolve_precision_policy(self.config.precision)
+
         self.model = keras.Sequential()
 
         # Camada de entrada
@@ -91,23 +142,98 @@ class GlaucomaPredictor:
 
         # Camadas ocultas
         for hidden_size in self.config.hidden_layers:
-            self.model.add(layers.Dense(hidden_size, activation="relu"))
-            self.model.add(layers.Dropout(0.2))  # Regularização
+            self.model.add(layers.Dense(hidden_size, activation="relu", dtype=policy))
+            self.model.add(layers.Dropout(0.2, dtype=policy))  # Regularização
 
         # Camada de saída
-        self.model.add(layers.Dense(self.config.output_size, activation="sigmoid"))
+        self.model.add(
+            layers.Dense(self.config.output_size, activation="sigmoid", dtype="float32")
+        )
 
-        # Compilação
+        # Compilação (float16 precisa de loss scaling para evitar underflow
+        # dos gradientes; bfloat16 tem a faixa do float32 e dispensa)
         optimizer = keras.optimizers.Adam(learning_rate=self.config.learning_rate)
+        if policy == "mixed_float16":
+            optimizer = keras.mixed_precision.LossScaleOptimizer(optimizer)
+        # jit_compile: XLA funde Dense → ReLU → Dropout em um único kernel
         self.model.compile(
             optimizer=optimizer,
             loss="binary_crossentropy",
             metrics=["mse", "mae"],
+            jit_compile=True,
         )
+        self._build_inference_model()
 
         print(f"Modelo construído com sucesso!")
         self.model.summary()
 
+    def _build_inference_model(self) -> None:
+        """
+        Cria o modelo de inferência (clone sem Dropout) e sua função compilada.
+        
+        Dropout não faz nada com training=False, mas continua no grafo e
+        aumenta o tempo de compilação XLA e o número de kernels por chamada.
+        A função de inferência captura o modelo no momento da criação, por
+        isso é recriada junto com ele.
+        """
+        self.inference_model = self._clone_without_dropout()
+
+        inference_model = self.inference_model
+        # A assinatura fixa (lote variável, float32) garante um único trace
+        # reutilizado por predict, predict_from_iop e predict_from_iop_batch
+        self._infer = tf.function(
+            lambda x: inference_model(x, training=False),
+            jit_compile=True,
+            input_signature=[
+                tf.TensorSpec([None, self.model.input_shape[-1]], tf.float32)
+            ],
+        )
+
+        # Caminho de uma amostra: recebe IOP e mortalidade como escalares,
+        # monta a entrada e aplica o clip dentro do grafo (uma única chamada)
+        input_shape = tf.constant([1, self.model.input_shape[-1]])
+
+        def predict_scalars(iop, mortality_rate):
+            x = tf.scatter_nd([[0, 0], [0, 1]], tf.stack([iop, mortality_rate]), input_shape)
+            y = inference_model(x, training=False)[0]
+            return tf.clip_by_value(tf.cast(y, tf.float32), 0.0, 1.0)
+
+        self._predict_scalars = tf.function(
+            predict_scalars,
+            jit_compile=True,
+            input_signature=[tf.TensorSpec([], tf.float32)] * 2,
+        )
+
+    def _clone_without_dropout(self, dtype: Optional[str] = None) -> "keras.Model":
+        """
+        Clona o modelo de treino sem as camadas Dropout, copiando os pesos.
+        
+        Args:
+            dtype (Optional[str]): Se informado, força esta política de
+                precisão em todas as camadas do clone.
+        
+        Returns:
+            keras.Model: Modelo sequencial equivalente para inferência.
+        """
+        clone_layers = []
+        for layer in self.model.layers:
+            if isinstance(layer, layers.Dropout):
+                continue
+            layer_config = layer.get_config()
+            if dtype is not None:
+                layer_config["dtype"] = dtype
+            clone_layers.append(layer.__class__.from_config(layer_config))
+        clone = keras.Sequential(
+            [keras.Input(shape=(self.model.input_shape[-1],))] + clone_layers
+        )
+        # Dropout não tem pesos: a ordem de get_weights() é a mesma nos dois
+        clone.set_weights(self.model.get_weights())
+        return clone
+
+    def _sync_inference_model(self) -> None:
+        """Copia os pesos do modelo de treino para o modelo de inferência."""
+        self.inference_model.set_weights(self.model.get_weights())
+
     def generate_synthetic_data(
         self, num_samples: int = 1000
     ) -> Tuple[np.ndarray, np.ndarray]:
@@ -124,20 +250,43 @@ class GlaucomaPredictor:
             Tuple[np.ndarray, np.ndarray]: (dados_entrada, dados_saída)
         """
         # Características de entrada: [IOP, mortalidade, saúde média, ...]
-        X = np.random.randn(num_samples, self.config.input_size)
-        X[:, 0] = np.random.uniform(10, 50, num_samples)  # IOP (10-50 mmHg)
-        X[:, 1] = np.random.uniform(0, 1, num_samples)  # Taxa de mortalidade
-
-        # Saídas: [progressão_glaucoma, vitalidade, risco]
-        y = np.random.uniform(0, 1, (num_samples, self.config.output_size))
+        # float32 de ponta a ponta: é o dtype do modelo, sem cópia na entrada
+        X = self._rng.standard_normal((num_samples, self.config.input_size), dtype=np.float32)
+        X[:, 0] = self._rng.uniform(10, 50, num_samples)  # IOP (10-50 mmHg)
+        X[:, 1] = self._rng.uniform(0, 1, num_samples)  # Taxa de mortalidade
 
-        # Correlação: IOP alta → maior progressão
+        # Saídas: [progressão_glaucoma, vitalidade, risco], todas derivadas de X
+        y = np.zeros((num_samples, self.config.output_size), dtype=np.float32)
         y[:, 0] = np.clip(X[:, 0] / 50, 0, 1)  # Progressão correlacionada com IOP
         y[:, 1] = np.clip(1 - X[:, 1], 0, 1)  # Vitalidade inversa à mortalidade
         y[:, 2] = np.clip((X[:, 0] - 21) / 30, 0, 1)  # Risco correlacionado com IOP
 
         return X, y
 
+    def _make_dataset(
+        self, X: np.ndarray, y: np.ndarray, shuffle: bool = False
+    ) -> "tf.data.Dataset":
+        """
+        Monta o pipeline tf.data de treino ou validação.
+        
+        cache() guarda os tensores após a primeira época e prefetch()
+        sobrepõe a preparação do próximo lote com o passo do modelo.
+        
+        Args:
+            X (np.ndarray): Dados de entrada.
+            y (np.ndarray): Dados de saída.
+            shuffle (bool): Se True, embaralha a cada época.
+        
+        Returns:
+            tf.data.Dataset: Dataset em lotes de config.batch_size.
+        """
+        dataset = tf.data.Dataset.from_tensor_slices(
+            (np.asarray(X, dtype=np.float32), np.asarray(y, dtype=np.float32))
+        ).cache()
+        if shuffle:
+            dataset = dataset.shuffle(len(X), reshuffle_each_iteration=True)
+        return dataset.batch(self.config.batch_size).prefetch(tf.data.AUTOTUNE)
+
     def train(
         self,
         X_train: Optional[np.ndarray] = None,
@@ -173,14 +322,15 @@ class GlaucomaPredictor:
             y_train, y_val = y[:split_idx], y[split_idx:]
 
         print(f"Treinando modelo com {len(X_train)} amostras...")
+        train_ds = self._make_dataset(X_train, y_train, shuffle=True)
+        val_ds = self._make_dataset(X_val, y_val) if X_val is not None else None
         self.history = self.model.fit(
-            X_train,
-            y_train,
-            batch_size=self.config.batch_size,
+            train_ds,
             epochs=self.config.epochs,
-            validation_data=(X_val, y_val),
+            validation_data=val_ds,
             verbose=1,
         )
+        self._sync_inference_model()
 
         return self.history.history
 
@@ -198,7 +348,7 @@ class GlaucomaPredictor:
             print("Erro: Modelo não foi construído ou treinado.")
             return np.array([])
 
-        return self.model.predict(X)
+        return self._infer(np.asarray(X, dtype=np.float32)).numpy()
 
     def evaluate(self, X_test: np.ndarray, y_test: np.ndarray) -> Dict:
         """
@@ -243,14 +393,150 @@ class GlaucomaPredictor:
         """
         if TENSORFLOW_AVAILABLE:
             self.model = keras.models.load_model(filepath)
+            self._build_inference_model()
+            self._bind_backend()
             print(f"Modelo carregado de: {filepath}")
 
+    def export_aot(self, out_dir: str, cpp_class: str = "GlaucomaAot") -> Dict[str, str]:
+        """
+        Exporta o modelo de inferência para compilação AOT com tfcompile.
+        
+        Congela o grafo para a entrada fixa (1, input_size) usada por
+        predict_from_iop e escreve o GraphDef e o config.pbtxt esperados
+        pelo tfcompile. Se o binário tfcompile estiver no PATH, gera também
+        o objeto e o header C++ (classe cpp_class), sem runtime TensorFlow
+        nem compilação JIT na inicialização.
+        
+        Args:
+            out_dir (str): Diretório de saída.
+            cpp_class (str): Nome da classe C++ gerada pelo tfcompile.
+        
+        Returns:
+            Dict[str, str]: Caminhos dos arquivos gerados (graph, config e,
+                se o tfcompile rodou, object e header).
+        """
+        if not TENSORFLOW_AVAILABLE or self.inference_model is None:
+            print("Erro: Modelo não foi construído.")
+            return {}
+
+        from tensorflow.python.framework.convert_to_constants import (
+            convert_variables_to_constants_v2,
+        )
+
+        input_size = self.model.input_shape[-1]
+        inference_model = self.inference_model
+        forward = tf.function(lambda x: inference_model(x, training=False))
+        concrete = forward.get_concrete_function(tf.TensorSpec([1, input_size], tf.float32))
+        frozen = convert_variables_to_constants_v2(concrete)
+        feed_name = frozen.inputs[0].op.name
+        fetch_name = frozen.outputs[0].op.name
+
+        os.makedirs(out_dir, exist_ok=True)
+        paths = {
+            "graph": os.path.join(out_dir, "graph.pb"),
+            "config": os.path.join(out_dir, "graph.config.pbtxt"),
+        }
+        tf.io.write_graph(frozen.graph.as_graph_def(), out_dir, "graph.pb", as_text=False)
+        with open(paths["config"], "w") as f:
+            f.write(
+                f'feed {{ id {{ node_name: "{feed_name}" }} '
+                f"shape {{ dim {{ size: 1 }} dim {{ size: {input_size} }} }} }}\n"
+                f'fetch {{ id {{ node_name: "{fetch_name}" }} }}\n'
+            )
+
+        tfcompile = shutil.which("tfcompile")
+        if tfcompile is None:
+            print(f"Grafo AOT exportado em: {out_dir} (tfcompile não encontrado no PATH)")
+            return paths
+
+        paths["object"] = os.path.join(out_dir, f"{cpp_class}.o")
+        paths["header"] = os.path.join(out_dir, f"{cpp_class}.h")
+        subprocess.run(
+            [
+                tfcompile,
+                f"--graph={paths['graph']}",
+                f"--config={paths['config']}",
+                f"--cpp_class={cpp_class}",
+                f"--out_object={paths['object']}",
+                f"--out_header={paths['header']}",
+            ],
+            check=True,
+        )
+        print(f"Modelo compilado AOT em: {out_dir}")
+        return paths
+
+    def export_tflite_int8(
+        self, filepath: str, representative_data: Optional[np.ndarray] = None
+    ) -> None:
+        """
+        Exporta o modelo de inferência para TFLite com quantização int8.
+        
+        Pesos e ativações são quantizados após o treino (entrada e saída
+        continuam float32); em CPUs x86 o XNNPACK usa produtos escalares
+        int8 (VNNI).
+        
+        Args:
+            filepath (str): Caminho do arquivo .tflite.
+            representative_data (Optional[np.ndarray]): Amostras de entrada
+                (N, input_size) para calibrar as faixas de quantização. Se
+                None, usa 200 amostras sintéticas.
+        """
+        if not TENSORFLOW_AVAILABLE or self.model is None:
+            print("Erro: Modelo não foi construído.")
+            return
+
+        if representative_data is None:
+            representative_data, _ = self.generate_synthetic_data(num_samples=200)
+        samples = np.asarray(representative_data, dtype=np.float32)
+
+        def representative_dataset():
+            for sample in samples:
+                yield [sample[np.newaxis, :]]
+
+        # O quantizador int8 parte de um grafo float32 (sem ops bfloat16/float16)
+        converter = tf.lite.TFLiteConverter.from_keras_model(
+            self._clone_without_dropout(dtype="float32")
+        )
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+        with open(filepath, "wb") as f:
+            f.write(converter.convert())
+        print(f"Modelo TFLite int8 salvo em: {filepath}")
+
+    def load_tflite(self, filepath: str) -> None:
+        """
+        Carrega um modelo TFLite; as predições passam a usá-lo.
+        
+        Args:
+            filepath (str): Caminho do arquivo .tflite.
+        """
+        if TENSORFLOW_AVAILABLE:
+            self._tflite = tf.lite.Interpreter(model_path=filepath)
+            self._tflite.allocate_tensors()
+            self._bind_backend()
+            print(f"Modelo TFLite carregado de: {filepath}")
+
+    def _run_tflite(self, X: np.ndarray) -> np.ndarray:
+        """Executa o interpretador TFLite sobre um lote (N, input_size)."""
+        interpreter = self._tflite
+        input_detail = interpreter.get_input_details()[0]
+        if tuple(input_detail["shape"]) != X.shape:
+            interpreter.resize_tensor_input(input_detail["index"], X.shape)
+            interpreter.allocate_tensors()
+        interpreter.set_tensor(input_detail["index"], X)
+        interpreter.invoke()
+        return interpreter.get_tensor(interpreter.get_output_details()[0]["index"])
+
     def predict_from_iop(self, iop: float, mortality_rate: float = 0.0) -> Dict[str, float]:
         """
         Prediz progressão de glaucoma a partir de IOP (e opcionalmente mortalidade).
 
-        Constrói o vetor de entrada esperado pelo modelo e retorna
-        um dicionário com as mesmas chaves de SimplePredictor.
+        Retorna um dicionário com as mesmas chaves de SimplePredictor.
+        Para varrer vários valores, prefira predict_from_iop_batch, que
+        executa o modelo uma única vez para todas as amostras.
 
         Args:
             iop (float): Pressão intraocular em mmHg.
@@ -259,26 +545,115 @@ class GlaucomaPredictor:
         Returns:
             Dict[str, float]: {glaucoma_progression, cell_vitality, risk_level}
         """
-        if not TENSORFLOW_AVAILABLE or self.model is None:
-            # Fallback para regas simples se o modelo não estiver disponível
-            normalized_iop = np.clip((iop - 10) / 40, 0, 1)
-            return {
-                "glaucoma_progression": float(normalized_iop),
-                "cell_vitality": float(max(0, 1 - normalized_iop)),
-                "risk_level": float(np.clip(normalized_iop * 1.5, 0, 1)),
-            }
-
-        # Monta vetor de entrada na mesma ordem do treinamento sintético:
-        # feature[0] = IOP, feature[1] = mortalidade, restante = 0
-        X = np.zeros((1, self.config.input_size), dtype=np.float32)
-        X[0, 0] = float(iop)
-        X[0, 1] = float(mortality_rate)
-
-        preds = self.model.predict(X, verbose=0)[0]  # shape (output_size,)
+        # _bind_backend sobrescreve este método na instância com o caminho
+        # escolhido (sem um frame extra por chamada); aqui só chega uma
+        # chamada feita pela classe, que é encaminhada à instância
+        return self.predict_from_iop(iop, mortality_rate)
+
+    def _predict_single_keras(self, iop: float, mortality_rate: float = 0.0) -> Dict[str, float]:
+        """Predição de uma amostra pela função escalar compilada."""
+        progression, vitality, risk = self._predict_scalars(
+            float(iop), float(mortality_rate)
+        ).numpy().tolist()
+        return {
+            "glaucoma_progression": progression,
+            "cell_vitality": vitality,
+            "risk_level": risk,
+        }
+
+    def _predict_single_tflite(self, iop: float, mortality_rate: float = 0.0) -> Dict[str, float]:
+        """Predição de uma amostra pelo TFLite, reutilizando o buffer de entrada."""
+        self._iop_buffer[0, 0] = iop
+        self._iop_buffer[0, 1] = mortality_rate
+        preds = np.clip(self._run_tflite(self._iop_buffer)[0], 0, 1).tolist()
+        return {
+            "glaucoma_progression": preds[0],
+            "cell_vitality": preds[1],
+            "risk_level": preds[2],
+        }
+
+    def _predict_single_batch(self, iop: float, mortality_rate: float = 0.0) -> Dict[str, float]:
+        """Predição de uma amostra como caso N=1 do caminho em lote."""
+        preds = self._predict_batch(
+            np.array([iop], dtype=np.float32),
+            np.array([mortality_rate], dtype=np.float32),
+        )
+        return {key: float(values[0]) for key, values in preds.items()}
+
+    def predict_from_iop_batch(
+        self, iops: np.ndarray, mortality_rates: Optional[np.ndarray] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Prediz a progressão de glaucoma para vários valores de IOP de uma vez.
+
+        Monta uma matriz (N, input_size) na mesma ordem do treinamento
+        sintético (feature[0] = IOP, feature[1] = mortalidade, restante = 0)
+        e executa a função compilada (ou o modelo TFLite, se carregado com
+        load_tflite) uma única vez, em vez de uma chamada por amostra.
+
+        Args:
+            iops (np.ndarray): Pressões intraoculares em mmHg, shape (N,).
+            mortality_rates (Optional[np.ndarray]): Taxas de mortalidade
+                acumuladas [0-1], shape (N,). Se None, usa zeros.
+
+        Returns:
+            Dict[str, np.ndarray]: {glaucoma_progression, cell_vitality,
+                risk_level}, cada um com shape (N,).
+        """
+        iops = np.asarray(iops, dtype=np.float32).ravel()
+        if mortality_rates is None:
+            mortality_rates = np.zeros_like(iops)
+        return self._predict_batch(iops, mortality_rates)
+
+    def _bind_backend(self) -> None:
+        """
+        Escolhe uma única vez o caminho de predição usado pelos métodos públicos.
+        
+        Chamado na construção e sempre que o modelo muda (load_model,
+        load_tflite), para que as chamadas de predição não precisem
+        verificar TensorFlow, modelo e TFLite a cada vez.
+        """
+        self.predict_from_iop = self._predict_single_batch
+        if self._tflite is not None:
+            self._run_backend = self._run_tflite
+            self._predict_batch = self._predict_batch_model
+            self.predict_from_iop = self._predict_single_tflite
+        elif TENSORFLOW_AVAILABLE and self._infer is not None:
+            self._run_backend = self._run_keras
+            self._predict_batch = self._predict_batch_model
+            self.predict_from_iop = self._predict_single_keras
+        else:
+            self._run_backend = None
+            self._predict_batch = self._predict_batch_rules
+
+    def _run_keras(self, X: np.ndarray) -> np.ndarray:
+        """Executa a função de inferência compilada sobre um lote (N, input_size)."""
+        return self._infer(X).numpy()
+
+    def _predict_batch_model(
+        self, iops: np.ndarray, mortality_rates: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """Predição em lote pelo modelo (Keras ou TFLite)."""
+        X = np.zeros((iops.size, self.config.input_size), dtype=np.float32)
+        X[:, 0] = iops
+        X[:, 1] = mortality_rates
+
+        preds = np.clip(self._run_backend(X), 0, 1)
+        return {
+            "glaucoma_progression": preds[:, 0],
+            "cell_vitality":        preds[:, 1],
+            "risk_level":           preds[:, 2],
+        }
+
+    def _predict_batch_rules(
+        self, iops: np.ndarray, mortality_rates: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """Predição em lote por regras simples (mesmas de SimplePredictor)."""
+        scores = iop_scores(iops)
         return {
-            "glaucoma_progression": float(np.clip(preds[0], 0, 1)),
-            "cell_vitality":        float(np.clip(preds[1], 0, 1)),
-            "risk_level":           float(np.clip(preds[2], 0, 1)),
+            "glaucoma_progression": scores[:, 0],
+            "cell_vitality": scores[:, 1],
+            "risk_level": scores[:, 2],
         }
 
 
@@ -293,38 +668,76 @@ class SimplePredictor:
         """Inicializa o preditor simples."""
         pass
 
-    def predict_from_iop(self, iop: float) -> Dict[str, float]:
+    def predict_from_iop(self, iop: float, mortality_rate: float = 0.0) -> Dict[str, float]:
         """
         Prediz progressão de glaucoma baseado em IOP.
         
         Args:
             iop (float): Pressão intraocular em mmHg.
+            mortality_rate (float): Ignorado; mantido para que a assinatura
+                seja a mesma de GlaucomaPredictor.predict_from_iop.
         
         Returns:
             Dict[str, float]: Dicionário com predições.
         """
-        # Normaliza IOP para 0-1
-        normalized_iop = np.clip((iop - 10) / 40, 0, 1)
+        # Aritmética escalar em Python puro: três np.clip custariam mais
+        # em despacho de ufunc do que as poucas operações em si
+        normalized_iop = min(1.0, max(0.0, (float(iop) - 10.0) / 40.0))
 
         return {
             "glaucoma_progression": normalized_iop,
-            "cell_vitality": max(0, 1 - normalized_iop),
-            "risk_level": np.clip(normalized_iop * 1.5, 0, 1),
+            "cell_vitality": 1.0 - normalized_iop,
+            "risk_level": min(1.0, normalized_iop * 1.5),
+        }
+
+    def predict_from_iop_batch(
+        self, iops: np.ndarray, mortality_rates: Optional[np.ndarray] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Prediz progressão de glaucoma para vários valores de IOP de uma vez.
+        
+        Args:
+            iops (np.ndarray): Pressões intraoculares em mmHg, shape (N,).
+            mortality_rates (Optional[np.ndarray]): Ignorado; mantido para
+                compatibilidade com GlaucomaPredictor.
+        
+        Returns:
+            Dict[str, np.ndarray]: Dicionário com arrays de predições (N,).
+        """
+        scores = iop_scores(iops)
+
+        return {
+            "glaucoma_progression": scores[:, 0],
+            "cell_vitality": scores[:, 1],
+            "risk_level": scores[:, 2],
         }
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Demonstração do modelo de IA de glaucoma")
+    parser.add_argument(
+        "--train", action="store_true", help="treina o modelo antes de predizer"
+    )
+    parser.add_argument(
+        "--epochs", type=int, default=1, help="épocas de treino (com --train)"
+    )
+    args = parser.parse_args()
+
     print("Inicializando modelo de IA para predição de glaucoma...\n")
 
     if TENSORFLOW_AVAILABLE:
-        config = ModelConfig()
+        config = ModelConfig(epochs=args.epochs)
         predictor = GlaucomaPredictor(config)
 
-        print("\nTreinando modelo...")
-        history = predictor.train(epochs=10)
+        # Por padrão só executa um forward pass (treinar é caro)
+        if args.train:
+            print("\nTreinando modelo...")
+            history = predictor.train()
 
         print("\nTeste de predição...")
-        X_test = np.random.randn(5, MODEL_INPUT_SIZE)
+        X_test = np.random.default_rng().standard_normal((5, MODEL_INPUT_SIZE))
         predictions = predictor.predict(X_test)
         print(f"Predições (5 amostras):\n{predictions}")
     else:
@@ -7,7 +7,9 @@ parâmetros de simulação.
 """
 
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
+
+import numpy as np
 
 # Suprimir warnings verbosos do TensorFlow (oneDNN)
 os.environ.setdefault("TF_ENABLE_ONEDNN_OPTS", "0")
@@ -26,12 +28,15 @@ RETINA_DEPTH: int = 50  # Profundidade (espessura) da retina
 TOTAL_CELLS: int = 10000  # Quantidade de células fotorreceptoras
 
 # Tipos de células presentes na retina simulada
-CELL_TYPES: Dict[str, int] = {
-    "photoreceptor": 0.4,  # 40% de fotorreceptores
-    "bipolar": 0.3,  # 30% de células bipolares
-    "ganglion": 0.2,  # 20% de células ganglionares
-    "glial": 0.1,  # 10% de células gliais
-}
+# (nome, proporção) em ordem fixa: a posição define o código int8 do tipo
+CELL_TYPES: Tuple[Tuple[str, float], ...] = (
+    ("photoreceptor", 0.4),  # 40% de fotorreceptores
+    ("bipolar", 0.3),  # 30% de células bipolares
+    ("ganglion", 0.2),  # 20% de células ganglionares
+    ("glial", 0.1),  # 10% de células gliais
+)
+CELL_TYPE_NAMES: Tuple[str, ...] = tuple(name for name, _ in CELL_TYPES)
+CELL_TYPE_PROPS: np.ndarray = np.array([prop for _, prop in CELL_TYPES])
 
 # ============================================================================
 # PARÂMETROS FÍSICOS E FISIOLÓGICOS
@@ -100,6 +105,9 @@ RECOVERY_WITH_TREATMENT: float = 1.5  # Fator de recuperação com tratamento
 MODEL_INPUT_SIZE: int = 20  # Dimensionalidade da entrada
 MODEL_HIDDEN_LAYERS: list = [64, 32, 16]  # Camadas ocultas
 MODEL_OUTPUT_SIZE: int = 3  # Saída: [progresso glaucoma, vitalidade, risco]
+# Política de precisão das camadas ocultas: "auto", "float32",
+# "mixed_bfloat16" ou "mixed_float16" ("auto" escolhe pelo hardware)
+MODEL_PRECISION: str = "auto"
 
 # Treinamento
 TRAIN_TEST_SPLIT: float = 0.8  # Proporção treino/teste
@@ -113,6 +121,8 @@ EPOCHS: int = 100
 
 FIGURE_DPI: int = 100  # Resolução de figuras
 FIGURE_SIZE: tuple = (12, 8)  # Tamanho padrão de figuras
+PNG_COMPRESS_LEVEL: int = 1  # Compressão zlib dos PNGs (1 = rápido, 9 = menor)
+MAX_SCATTER_POINTS: int = 50000  # Máximo de células desenhadas na retina 3D
 
 # Mapa de cores para visualização
 COLORMAP_RETINA: str = "viridis"  # Colormap para retina 3D
@@ -146,7 +156,7 @@ def get_config() -> Dict[str, Any]:
             "height": RETINA_HEIGHT,
             "depth": RETINA_DEPTH,
             "total_cells": TOTAL_CELLS,
-            "cell_types": CELL_TYPES,
+            "cell_types": dict(CELL_TYPES),
         },
         "physics": {
             "initial_iop": INITIAL_IOP,
@@ -0,0 +1,389 @@
+"""
+Módulo de Kernels Numéricos da Simulação.
+
+Reúne os laços numéricos da simulação e do preditor por regras. Quando o
+Numba está instalado, os kernels são compilados com @njit e rodam em uma
+única passada sobre os arrays, sem arrays temporários; caso contrário,
+uma implementação equivalente em NumPy é usada. Sem Numba, o dano por
+passo usa o kernel Cython de scripts/_damage_c.pyx, se ele foi compilado.
+"""
+
+import numpy as np
+from typing import Tuple
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+try:
+    # Kernel compilado opcional (ver scripts/_damage_c.pyx)
+    from scripts._damage_c import apply_damage_c
+    CYTHON_AVAILABLE = True
+except ImportError:
+    CYTHON_AVAILABLE = False
+
+
+def _apply_damage_numpy(
+    health: np.ndarray, alive: np.ndarray, chosen: np.ndarray, damages: np.ndarray
+) -> int:
+    """Implementação NumPy de apply_damage (usada sem o kernel Cython)."""
+    damaged = np.maximum(0.0, health[chosen] - damages)
+    health[chosen] = damaged
+    died = chosen[(damaged <= 0.0) & alive[chosen]]
+    alive[died] = False
+    return int(died.size)
+
+
+def apply_damage(
+    health: np.ndarray, alive: np.ndarray, chosen: np.ndarray, damages: np.ndarray
+) -> int:
+    """
+    Aplica dano às células escolhidas, modificando os arrays in-place.
+
+    Usado pelo caminho sem Numba de run_steps (com Numba, o laço de dano
+    fica dentro do próprio kernel). Usa o kernel Cython se compilado.
+    Só contam como mortes as células que estavam vivas antes do dano.
+
+    Args:
+        health (np.ndarray): Saúde de todas as células (float32 ou float64).
+        alive (np.ndarray): Máscara de células vivas (bool).
+        chosen (np.ndarray): Índices das células que recebem dano (sem repetição).
+        damages (np.ndarray): Dano aplicado a cada célula escolhida.
+
+    Returns:
+        int: Número de células que morreram neste passo.
+    """
+    if CYTHON_AVAILABLE:
+        return int(apply_damage_c(
+            health,
+            alive.view(np.uint8),
+            np.ascontiguousarray(chosen, dtype=np.intp),
+            np.ascontiguousarray(damages, dtype=np.float64),
+        ))
+    return _apply_damage_numpy(health, alive, chosen, damages)
+
+
+def _sample_alive_python(ids, n_alive, n_select, u):
+    """Implementação Python de sample_alive (usada sem Numba)."""
+    for k in range(n_select):
+        r = k + int(u[k] * (n_alive - k))
+        ids[k], ids[r] = ids[r], ids[k]
+
+
+def _drop_dead_python(ids, n_alive, n_select, alive):
+    """Implementação Python de drop_dead (usada sem Numba)."""
+    for k in range(n_select - 1, -1, -1):
+        if not alive[ids[k]]:
+            n_alive -= 1
+            ids[k] = ids[n_alive]
+    return n_alive
+
+
+if NUMBA_AVAILABLE:
+
+    _sample_alive_numba = njit(cache=True)(_sample_alive_python)
+    _drop_dead_numba = njit(cache=True)(_drop_dead_python)
+
+
+def sample_alive(ids: np.ndarray, n_alive: int, n_select: int, u: np.ndarray) -> np.ndarray:
+    """
+    Sorteia células vivas sem reposição por Fisher-Yates parcial.
+    
+    ids[:n_alive] guarda os índices das células vivas em qualquer ordem; as
+    n_select primeiras posições são embaralhadas in-place e passam a conter
+    a amostra, em O(n_select).
+    
+    Args:
+        ids (np.ndarray): Conjunto de índices vivos (modificado in-place).
+        n_alive (int): Número de índices válidos em ids.
+        n_select (int): Tamanho da amostra (<= n_alive).
+        u (np.ndarray): n_select valores uniformes em [0, 1).
+    
+    Returns:
+        np.ndarray: View ids[:n_select] com os índices sorteados.
+    """
+    if NUMBA_AVAILABLE:
+        _sample_alive_numba(ids, n_alive, n_select, u)
+    else:
+        _sample_alive_python(ids, n_alive, n_select, u)
+    return ids[:n_select]
+
+
+def drop_dead(ids: np.ndarray, n_alive: int, n_select: int, alive: np.ndarray) -> int:
+    """
+    Remove do conjunto de índices vivos as células da amostra que morreram.
+    
+    Cada célula morta é trocada pelo último índice válido (swap-pop), em
+    O(n_select).
+    
+    Args:
+        ids (np.ndarray): Conjunto de índices vivos, com a amostra em ids[:n_select].
+        n_alive (int): Número de índices válidos em ids.
+        n_select (int): Tamanho da amostra sorteada por sample_alive.
+        alive (np.ndarray): Máscara de células vivas após o dano.
+    
+    Returns:
+        int: Novo número de índices válidos.
+    """
+    if NUMBA_AVAILABLE:
+        return int(_drop_dead_numba(ids, n_alive, n_select, alive))
+    return _drop_dead_python(ids, n_alive, n_select, alive)
+
+
+def _iop_scores_numpy(iops: np.ndarray) -> np.ndarray:
+    """Implementação NumPy de iop_scores (usada sem Numba)."""
+    normalized = np.clip((iops - 10.0) / 40.0, 0.0, 1.0)
+    return np.stack(
+        [normalized, 1.0 - normalized, np.minimum(normalized * 1.5, 1.0)], axis=1
+    )
+
+
+if NUMBA_AVAILABLE:
+
+    @njit(cache=True, fastmath=True)
+    def _iop_scores_numba(iops):
+        out = np.empty((iops.size, 3))
+        for i in range(iops.size):
+            n = min(1.0, max(0.0, (iops[i] - 10.0) / 40.0))
+            out[i, 0] = n
+            out[i, 1] = 1.0 - n
+            out[i, 2] = min(1.0, n * 1.5)
+        return out
+
+
+def iop_scores(iops: np.ndarray) -> np.ndarray:
+    """
+    Calcula os escores baseados em regras para vários valores de IOP.
+
+    Args:
+        iops (np.ndarray): Pressões intraoculares em mmHg, shape (N,).
+
+    Returns:
+        np.ndarray: Matriz (N, 3) com [progressão, vitalidade, risco].
+    """
+    iops = np.ascontiguousarray(iops, dtype=np.float64).ravel()
+    if NUMBA_AVAILABLE:
+        return _iop_scores_numba(iops)
+    return _iop_scores_numpy(iops)
+
+
+def _death_rate(iop, normal_max, damage_threshold, rates):
+    """Seleciona a taxa de morte celular para a IOP (mesmas faixas do simulador)."""
+    if iop <= normal_max:
+        return rates[0]
+    elif iop < damage_threshold:
+        return rates[1]
+    return rates[2]
+
+
+def _run_steps_numpy(
+    health, alive, noise, seed, current_iop, initial_iop, treatment_active,
+    normal_max, damage_threshold, rates, iop_out, alive_out, killed_out, health_sum_out,
+):
+    """Implementação NumPy de run_steps (usada sem Numba)."""
+    rng = np.random.default_rng(seed)
+    alive_count = int(alive.sum())
+    health_sum = float(health[alive].sum(dtype=np.float64))
+    iop = current_iop
+    for t in range(noise.size):
+        if treatment_active:
+            change = 0.15 * (normal_max - iop)
+        else:
+            change = 0.05 * (initial_iop + 2.0 - iop) + 0.01
+        iop = max(5.0, iop + change + noise[t])
+
+        n_select = int(alive_count * _death_rate(iop, normal_max, damage_threshold, rates))
+        killed = 0
+        if n_select > 0:
+            chosen = rng.choice(np.flatnonzero(alive), size=n_select, replace=False)
+            before = float(health[chosen].sum(dtype=np.float64))
+            killed = apply_damage(health, alive, chosen, rng.uniform(0.1, 0.5, size=n_select))
+            health_sum += float(health[chosen].sum(dtype=np.float64)) - before
+            alive_count -= killed
+
+        iop_out[t] = iop
+        alive_out[t] = alive_count
+        killed_out[t] = killed
+        health_sum_out[t] = health_sum
+    return iop
+
+
+if NUMBA_AVAILABLE:
+
+    _death_rate_numba = njit(cache=True)(_death_rate)
+
+    @njit(cache=True)
+    def _run_steps_numba(
+        health, alive, noise, seed, current_iop, initial_iop, treatment_active,
+        normal_max, damage_threshold, rates, iop_out, alive_out, killed_out, health_sum_out,
+    ):
+        np.random.seed(seed)
+        # Índices vivos em [0, n_alive); mortos saem por troca com o último
+        idx = np.flatnonzero(alive)
+        n_alive = idx.size
+        health_sum = 0.0
+        for k in range(n_alive):
+            health_sum += health[idx[k]]
+
+        iop = current_iop
+        for t in range(noise.size):
+            if treatment_active:
+                change = 0.15 * (normal_max - iop)
+            else:
+                change = 0.05 * (initial_iop + 2.0 - iop) + 0.01
+            iop = max(5.0, iop + change + noise[t])
+
+            n_select = int(n_alive * _death_rate_numba(iop, normal_max, damage_threshold, rates))
+            # Fisher-Yates parcial: idx[:n_select] vira a amostra sem reposição
+            for k in range(n_select):
+                r = k + np.random.randint(0, n_alive - k)
+                i = idx[r]
+                idx[r] = idx[k]
+                idx[k] = i
+                old = health[i]
+                h = old - np.random.uniform(0.1, 0.5)
+                if h < 0.0:
+                    h = 0.0
+                health[i] = h
+                health_sum += health[i] - old
+
+            killed = 0
+            for k in range(n_select - 1, -1, -1):
+                i = idx[k]
+                if health[i] <= 0.0 and alive[i]:
+                    alive[i] = False
+                    n_alive -= 1
+                    idx[k] = idx[n_alive]
+                    killed += 1
+
+            iop_out[t] = iop
+            alive_out[t] = n_alive
+            killed_out[t] = killed
+            health_sum_out[t] = health_sum
+        return iop
+
+
+def run_steps(
+    health: np.ndarray,
+    alive: np.ndarray,
+    noise: np.ndarray,
+    seed: int,
+    current_iop: float,
+    initial_iop: float,
+    treatment_active: bool,
+    normal_max: float,
+    damage_threshold: float,
+    rates: Tuple[float, float, float],
+) -> Tuple[float, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Executa vários passos de simulação em um único kernel.
+    
+    A cada passo, atualiza a IOP com o ruído pré-sorteado, escolhe células
+    vivas sem reposição conforme a taxa de morte da faixa de pressão e
+    aplica o dano, modificando health e alive in-place.
+    
+    Args:
+        health (np.ndarray): Saúde de todas as células.
+        alive (np.ndarray): Máscara de células vivas (bool).
+        noise (np.ndarray): Ruído de IOP de cada passo, shape (n_passos,).
+        seed (int): Semente do sorteio de células e danos.
+        current_iop (float): IOP antes do primeiro passo.
+        initial_iop (float): IOP inicial da simulação (base da deriva).
+        treatment_active (bool): Se o tratamento está ativo.
+        normal_max (float): Limite superior da faixa normal de IOP.
+        damage_threshold (float): IOP a partir da qual o dano é severo.
+        rates (Tuple[float, float, float]): Taxas de morte normal, elevada e severa.
+    
+    Returns:
+        Tuple: (IOP final, IOP por passo, células vivas por passo,
+            células mortas em cada passo, soma da saúde das vivas por passo).
+    """
+    n_steps = noise.size
+    iops = np.empty(n_steps)
+    alive_counts = np.empty(n_steps, dtype=np.int64)
+    killed = np.empty(n_steps, dtype=np.int64)
+    health_sums = np.empty(n_steps)
+    kernel = _run_steps_numba if NUMBA_AVAILABLE else _run_steps_numpy
+    final_iop = kernel(
+        health, alive, np.ascontiguousarray(noise, dtype=np.float64), seed,
+        float(current_iop), float(initial_iop), bool(treatment_active),
+        float(normal_max), float(damage_threshold), np.asarray(rates, dtype=np.float64),
+        iops, alive_counts, killed, health_sums,
+    )
+    return float(final_iop), iops, alive_counts, killed, health_sums
+
+
+if NUMBA_AVAILABLE:
+
+    @njit(cache=True, parallel=True)
+    def _run_ensemble_numba(
+        health0, alive0, noise, seeds, current_iop, initial_iop, treatment_active,
+        normal_max, damage_threshold, rates, iop_out, alive_out, killed_out, health_sum_out,
+    ):
+        # Réplicas independentes: cada uma roda inteira em uma thread
+        for r in prange(seeds.size):
+            _run_steps_numba(
+                health0.copy(), alive0.copy(), noise[r], seeds[r], current_iop,
+                initial_iop, treatment_active, normal_max, damage_threshold, rates,
+                iop_out[r], alive_out[r], killed_out[r], health_sum_out[r],
+            )
+
+
+def run_ensemble(
+    health: np.ndarray,
+    alive: np.ndarray,
+    noise: np.ndarray,
+    seeds: np.ndarray,
+    current_iop: float,
+    initial_iop: float,
+    treatment_active: bool,
+    normal_max: float,
+    damage_threshold: float,
+    rates: Tuple[float, float, float],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Executa várias réplicas independentes de run_steps a partir do mesmo estado.
+    
+    Com Numba, as réplicas são distribuídas entre os núcleos (prange). Os
+    arrays health e alive não são modificados: cada réplica usa uma cópia.
+    
+    Args:
+        health (np.ndarray): Saúde inicial de todas as células.
+        alive (np.ndarray): Máscara inicial de células vivas (bool).
+        noise (np.ndarray): Ruído de IOP, shape (n_réplicas, n_passos).
+        seeds (np.ndarray): Semente de cada réplica, shape (n_réplicas,).
+        current_iop (float): IOP antes do primeiro passo.
+        initial_iop (float): IOP inicial da simulação (base da deriva).
+        treatment_active (bool): Se o tratamento está ativo.
+        normal_max (float): Limite superior da faixa normal de IOP.
+        damage_threshold (float): IOP a partir da qual o dano é severo.
+        rates (Tuple[float, float, float]): Taxas de morte normal, elevada e severa.
+    
+    Returns:
+        Tuple: (IOP, células vivas, células mortas no passo, soma da saúde
+            das vivas), cada um com shape (n_réplicas, n_passos).
+    """
+    noise = np.ascontiguousarray(noise, dtype=np.float64)
+    seeds = np.ascontiguousarray(seeds, dtype=np.int64)
+    shape = noise.shape
+    iops = np.empty(shape)
+    alive_counts = np.empty(shape, dtype=np.int64)
+    killed = np.empty(shape, dtype=np.int64)
+    health_sums = np.empty(shape)
+    args = (
+        float(current_iop), float(initial_iop), bool(treatment_active),
+        float(normal_max), float(damage_threshold), np.asarray(rates, dtype=np.float64),
+    )
+    if NUMBA_AVAILABLE:
+        _run_ensemble_numba(
+            health, alive, noise, seeds, *args, iops, alive_counts, killed, health_sums
+        )
+    else:
+        for r in range(seeds.size):
+            _run_steps_numpy(
+                health.copy(), alive.copy(), noise[r], int(seeds[r]), *args,
+                iops[r], alive_counts[r], killed[r], health_sums[r],
+            )
+    return iops, alive_counts, killed, health_sums
@@ -7,22 +7,26 @@ propriedades de saúde e localização.
 """
 
 import numpy as np
-from typing import Tuple, List, Dict, Optional
-from dataclasses import dataclass
+from collections.abc import Sequence
+from typing import Tuple, List, Dict, NamedTuple, Optional, Union
 from scripts.config import (
     RETINA_WIDTH,
     RETINA_HEIGHT,
     RETINA_DEPTH,
     TOTAL_CELLS,
-    CELL_TYPES,
+    CELL_TYPE_NAMES,
+    CELL_TYPE_PROPS,
 )
 
 
-@dataclass
-class Cell:
+class Cell(NamedTuple):
     """
     Representa uma célula individual na retina.
     
+    É um registro imutável (NamedTuple, sem __dict__ por instância): o
+    estado vivo da retina fica nos arrays da RetinaSim e cada Cell é
+    apenas uma cópia desse estado.
+    
     Attributes:
         cell_id (int): Identificador único da célula.
         cell_type (str): Tipo de célula (photoreceptor, bipolar, ganglion, glial).
@@ -46,12 +50,61 @@ class Cell:
         return f"Cell(id={self.cell_id}, type={self.cell_type}, pos=({self.x:.1f}, {self.y:.1f}, {self.z:.1f}), health={self.health:.2f})"
 
 
+class _CellSequence(Sequence):
+    """
+    Visão somente leitura das células de uma RetinaSim como objetos Cell.
+
+    Cada acesso cria um Cell com uma cópia do estado atual; alterações
+    devem ser feitas pelos métodos da RetinaSim (damage_cell, heal_cell).
+    """
+
+    def __init__(self, retina: "RetinaSim"):
+        self._retina = retina
+
+    def __len__(self) -> int:
+        return self._retina.health.size
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Cell, List[Cell]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        retina = self._retina
+        i = range(len(self))[index]
+        return Cell(
+            cell_id=i,
+            cell_type=retina._type_name(retina.cell_type_id[i]),
+            x=float(retina.x[i]),
+            y=float(retina.y[i]),
+            z=float(retina.z[i]),
+            health=float(retina.health[i]),
+            is_alive=bool(retina.is_alive[i]),
+        )
+
+
 class RetinaSim:
     """
     Classe para simular e gerenciar uma retina 3D.
     
     Esta classe implementa a geração, armazenamento e manipulação de uma
     população de células que representam a estrutura da retina humana.
+
+    O estado é guardado como estrutura de arrays (um array NumPy por campo,
+    indexado pelo ID da célula) para que agregações e atualizações em lote
+    rodem em C em vez de percorrer objetos Python.
+
+    Attributes:
+        x, y, z (np.ndarray): Coordenadas das células (float32), visões das
+            colunas de uma única matriz (N, 3). Os IDs seguem a ordem
+            crescente de z.
+        health (np.ndarray): Saúde das células, 0.0 a 1.0 (float32).
+        is_alive (np.ndarray): Máscara de células vivas (bool).
+        cell_type_id (np.ndarray): Índice do tipo em cell_type_names (int8).
+        grid_index (np.ndarray): Índice linear y * width + x da célula no
+            grid 2D dos mapas de saúde (int32).
+        cell_type_names (List[str]): Nomes dos tipos de célula.
+        cell_type_codes (Dict[str, int]): Código int8 de cada tipo.
+        version (int): Incrementado sempre que o conjunto de células vivas
+            muda (mortes ou update_counters); permite a quem guarda índices
+            de vivas saber quando reconstruí-los.
     """
 
     def __init__(
@@ -61,6 +114,7 @@ class RetinaSim:
         depth: int = RETINA_DEPTH,
         num_cells: int = TOTAL_CELLS,
         cell_distribution: Optional[Dict[str, float]] = None,
+        rng: Optional[np.random.Generator] = None,
     ):
         """
         Inicializa a simulação da retina.
@@ -71,14 +125,23 @@ class RetinaSim:
             depth (int): Profundidade (espessura) da retina.
             num_cells (int): Número total de células.
             cell_distribution (Optional[Dict[str, float]]): Distribuição de tipos
-                de células. Se None, usa CELL_TYPES.
+                de células (nome -> proporção). Se None, usa CELL_TYPES.
+            rng (Optional[np.random.Generator]): Gerador de números aleatórios.
+                Se None, usa um gerador com seed 42 (reprodutível).
         """
         self.width = width
         self.height = height
         self.depth = depth
         self.num_cells = num_cells
-        self.cells: List[Cell] = []
-        self.cell_distribution = cell_distribution or CELL_TYPES
+        if cell_distribution is None:
+            self.cell_type_names: List[str] = list(CELL_TYPE_NAMES)
+            self._type_props = CELL_TYPE_PROPS
+        else:
+            self.cell_type_names = list(cell_distribution)
+            self._type_props = np.array(list(cell_distribution.values()), dtype=np.float64)
+        self.cell_distribution = dict(zip(self.cell_type_names, self._type_props.tolist()))
+        self._rng = rng if rng is not None else np.random.default_rng(42)
+        self.version = 0
 
         # Gera as células iniciais
         self._generate_cells()
@@ -92,28 +155,106 @@ class RetinaSim:
         - A distribuição de tipos segue CELL_TYPES.
         - Todas as células iniciam com health = 1.0 e is_alive = True.
         """
-        np.random.seed(42)  # Para reprodutibilidade
-
-        cell_id = 0
-        for cell_type, proportion in self.cell_distribution.items():
-            num_of_type = int(self.num_cells * proportion)
-
-            for _ in range(num_of_type):
-                x = np.random.uniform(0, self.width)
-                y = np.random.uniform(0, self.height)
-                z = np.random.uniform(0, self.depth)
-
-                cell = Cell(
-                    cell_id=cell_id,
-                    cell_type=cell_type,
-                    x=x,
-                    y=y,
-                    z=z,
-                    health=1.0,
-                    is_alive=True,
-                )
-                self.cells.append(cell)
-                cell_id += 1
+        self.cell_type_codes: Dict[str, int] = {
+            name: code for code, name in enumerate(self.cell_type_names)
+        }
+        counts = np.floor(self.num_cells * self._type_props).astype(np.int64)
+        self.cell_type_id = np.repeat(
+            np.arange(len(self.cell_type_names), dtype=np.int8), counts
+        )
+        # Os tipos não mudam durante a simulação: totais por tipo ficam fixos
+        self._type_totals = counts.tolist()
+        total = self.cell_type_id.size
+
+        # Todas as coordenadas em uma única chamada ao gerador
+        scale = np.array([self.width, self.height, self.depth], dtype=np.float32)
+        coords = self._rng.random((total, 3), dtype=np.float32) * scale
+
+        # Células ordenadas por profundidade: cortes em z viram faixas
+        # contíguas encontradas por busca binária (ver z_band)
+        order = np.argsort(coords[:, 2], kind="stable")
+        self.cell_type_id = self.cell_type_id[order]
+        # Coordenadas guardadas juntas em (N, 3); x, y e z são visões das colunas
+        self._coords = coords[order]
+
+        # As células não se movem: índice linear no grid (altura x largura)
+        # dos mapas 2D calculado uma única vez
+        x_idx = (self.x / self.width * (self.width - 1)).astype(np.int32)
+        y_idx = (self.y / self.height * (self.height - 1)).astype(np.int32)
+        self.grid_index = y_idx * np.int32(self.width) + x_idx
+
+        self.health = np.ones(total, dtype=np.float32)
+        self.is_alive = np.ones(total, dtype=bool)
+        self.update_counters()
+
+    def z_band(self, z_min: float, z_max: float) -> slice:
+        """
+        Seleciona as células com z_min < z < z_max.
+        
+        Como as células estão ordenadas por z, a faixa é contígua e é
+        encontrada por duas buscas binárias, sem varrer todas as células.
+        
+        Args:
+            z_min (float): Limite inferior (exclusivo) da profundidade.
+            z_max (float): Limite superior (exclusivo) da profundidade.
+        
+        Returns:
+            slice: Fatia dos IDs das células na faixa.
+        """
+        lo = int(np.searchsorted(self.z, z_min, side="right"))
+        hi = int(np.searchsorted(self.z, z_max, side="left"))
+        return slice(lo, max(lo, hi))
+
+    def update_counters(
+        self, alive_count: Optional[int] = None, health_sum: Optional[float] = None
+    ) -> None:
+        """
+        Atualiza os contadores de células vivas e da soma de saúde.
+        
+        damage_cell e heal_cell mantêm os contadores atualizados; código que
+        modifica health ou is_alive diretamente (ex.: kernels da simulação)
+        deve chamar este método ao terminar. Se o código já acompanhou os
+        totais, pode informá-los e evitar a varredura dos arrays. Sempre
+        incrementa version, pois is_alive pode ter mudado.
+        
+        Args:
+            alive_count (Optional[int]): Número de células vivas já conhecido.
+            health_sum (Optional[float]): Soma da saúde das vivas já conhecida.
+        """
+        self.version += 1
+        if alive_count is not None and health_sum is not None:
+            self._alive_count = int(alive_count)
+            self._health_sum = float(health_sum)
+            return
+        self._alive_count = int(np.count_nonzero(self.is_alive))
+        self._health_sum = float(self.health[self.is_alive].sum(dtype=np.float64))
+
+    # x, y e z são propriedades (não atributos) para que continuem sendo
+    # visões de _coords mesmo após pickle, como na Pool de main.py
+    @property
+    def x(self) -> np.ndarray:
+        """Coordenada X das células (visão da coluna 0 de _coords)."""
+        return self._coords[:, 0]
+
+    @property
+    def y(self) -> np.ndarray:
+        """Coordenada Y das células (visão da coluna 1 de _coords)."""
+        return self._coords[:, 1]
+
+    @property
+    def z(self) -> np.ndarray:
+        """Coordenada Z das células (visão da coluna 2 de _coords)."""
+        return self._coords[:, 2]
+
+    @property
+    def cells(self) -> Sequence:
+        """
+        Visão das células como objetos Cell (somente leitura).
+        
+        Returns:
+            Sequence: Sequência de Cell criados sob demanda a partir dos arrays.
+        """
+        return _CellSequence(self)
 
     def get_cell_coordinates(self) -> np.ndarray:
         """
@@ -122,10 +263,7 @@ class RetinaSim:
         Returns:
             np.ndarray: Matriz de forma (num_live_cells, 3) com coordenadas (x, y, z).
         """
-        coords = np.array(
-            [(cell.x, cell.y, cell.z) for cell in self.cells if cell.is_alive]
-        )
-        return coords
+        return self._coords[self.is_alive]
 
     def get_cell_health(self) -> np.ndarray:
         """
@@ -134,8 +272,7 @@ class RetinaSim:
         Returns:
             np.ndarray: Vetor de saúde das células.
         """
-        health = np.array([cell.health for cell in self.cells if cell.is_alive])
-        return health
+        return self.health[self.is_alive]
 
     def get_alive_cells_count(self) -> int:
         """
@@ -144,7 +281,7 @@ class RetinaSim:
         Returns:
             int: Quantidade de células vivas.
         """
-        return sum(1 for cell in self.cells if cell.is_alive)
+        return self._alive_count
 
     def get_dead_cells_count(self) -> int:
         """
@@ -153,7 +290,7 @@ class RetinaSim:
         Returns:
             int: Quantidade de células mortas.
         """
-        return sum(1 for cell in self.cells if not cell.is_alive)
+        return self.is_alive.size - self.get_alive_cells_count()
 
     def get_average_health(self) -> float:
         """
@@ -162,10 +299,9 @@ class RetinaSim:
         Returns:
             float: Saúde média (0.0 a 1.0).
         """
-        alive_cells = [cell for cell in self.cells if cell.is_alive]
-        if not alive_cells:
+        if self._alive_count == 0:
             return 0.0
-        return sum(cell.health for cell in alive_cells) / len(alive_cells)
+        return self._health_sum / self._alive_count
 
     def damage_cell(self, cell_id: int, damage_amount: float) -> bool:
         """
@@ -178,13 +314,18 @@ class RetinaSim:
         Returns:
             bool: True se a célula morreu, False caso contrário.
         """
-        if 0 <= cell_id < len(self.cells):
-            cell = self.cells[cell_id]
-            cell.health = max(0.0, cell.health - damage_amount)
-
-            if cell.health <= 0.0 and cell.is_alive:
-                cell.is_alive = False
-                return True
+        if 0 <= cell_id < self.health.size:
+            old_health = float(self.health[cell_id])
+            health = max(0.0, old_health - damage_amount)
+            self.health[cell_id] = health
+
+            if self.is_alive[cell_id]:
+                self._health_sum += health - old_health
+                if health <= 0.0:
+                    self.is_alive[cell_id] = False
+                    self._alive_count -= 1
+                    self.version += 1
+                    return True
         return False
 
     def heal_cell(self, cell_id: int, heal_amount: float) -> None:
@@ -195,9 +336,80 @@ class RetinaSim:
             cell_id (int): ID da célula a ser curada.
             heal_amount (float): Quantidade de cura (0.0 a 1.0).
         """
-        if 0 <= cell_id < len(self.cells):
-            cell = self.cells[cell_id]
-            cell.health = min(1.0, cell.health + heal_amount)
+        if 0 <= cell_id < self.health.size:
+            old_health = float(self.health[cell_id])
+            health = min(1.0, old_health + heal_amount)
+            self.health[cell_id] = health
+            if self.is_alive[cell_id]:
+                self._health_sum += health - old_health
+
+    def damage_cells(self, cell_ids: np.ndarray, damage_amounts: np.ndarray) -> int:
+        """
+        Aplica dano a várias células de uma vez.
+        
+        Versão vetorizada de damage_cell. Os IDs não devem se repetir.
+        
+        Args:
+            cell_ids (np.ndarray): IDs das células a danificar.
+            damage_amounts (np.ndarray): Dano de cada célula (ou escalar).
+        
+        Returns:
+            int: Número de células que morreram.
+        """
+        cell_ids = np.asarray(cell_ids, dtype=np.intp)
+        old_health = self.health[cell_ids]
+        new_health = np.maximum(0.0, old_health - damage_amounts).astype(np.float32)
+        self.health[cell_ids] = new_health
+
+        was_alive = self.is_alive[cell_ids]
+        self._health_sum += float(
+            (new_health[was_alive] - old_health[was_alive]).sum(dtype=np.float64)
+        )
+        died = cell_ids[was_alive & (new_health <= 0.0)]
+        self.is_alive[died] = False
+        self._alive_count -= died.size
+        if died.size:
+            self.version += 1
+        return int(died.size)
+
+    def heal_cells(self, cell_ids: np.ndarray, heal_amounts: np.ndarray) -> None:
+        """
+        Cura várias células de uma vez.
+        
+        Versão vetorizada de heal_cell. Os IDs não devem se repetir.
+        
+        Args:
+            cell_ids (np.ndarray): IDs das células a curar.
+            heal_amounts (np.ndarray): Cura de cada célula (ou escalar).
+        """
+        cell_ids = np.asarray(cell_ids, dtype=np.intp)
+        old_health = self.health[cell_ids]
+        new_health = np.minimum(1.0, old_health + heal_amounts).astype(np.float32)
+        self.health[cell_ids] = new_health
+
+        was_alive = self.is_alive[cell_ids]
+        self._health_sum += float(
+            (new_health[was_alive] - old_health[was_alive]).sum(dtype=np.float64)
+        )
+
+    def _type_name(self, code: int) -> str:
+        """Retorna o nome do tipo de célula correspondente a um código int8."""
+        return self.cell_type_names[code]
+
+    def get_cell_ids_by_type(self, cell_type: str) -> np.ndarray:
+        """
+        Retorna os IDs de todas as células de um tipo específico.
+        
+        Args:
+            cell_type (str): Tipo de célula a filtrar.
+        
+        Returns:
+            np.ndarray: IDs das células do tipo (vazio se o tipo não existe).
+        """
+        code = self.cell_type_codes.get(cell_type)
+        if code is None:
+            return np.empty(0, dtype=np.intp)
+        return np.flatnonzero(self.cell_type_id == code)
 
     def get_cells_by_type(self, cell_type: str) -> List[Cell]:
         """
@@ -209,7 +421,8 @@ class RetinaSim:
         Returns:
             List[Cell]: Lista de células do tipo especificado.
         """
-        return [cell for cell in self.cells if cell.cell_type == cell_type]
+        cells = self.cells
+        return [cells[i] for i in self.get_cell_ids_by_type(cell_type).tolist()]
 
     def get_statistics(self) -> Dict[str, any]:
         """
@@ -218,20 +431,22 @@ class RetinaSim:
         Returns:
             Dict[str, any]: Dicionário com estatísticas desagregadas.
         """
-        total_cells = len(self.cells)
+        total_cells = self.health.size
         alive_cells = self.get_alive_cells_count()
-        dead_cells = self.get_dead_cells_count()
+        dead_cells = total_cells - alive_cells
         avg_health = self.get_average_health()
 
-        type_stats = {}
-        for cell_type in self.cell_distribution.keys():
-            cells_of_type = self.get_cells_by_type(cell_type)
-            alive = sum(1 for c in cells_of_type if c.is_alive)
-            type_stats[cell_type] = {
-                "total": len(cells_of_type),
-                "alive": alive,
-                "dead": len(cells_of_type) - alive,
-            }
+        # Vivas por tipo em uma passada vetorizada; totais fixados na geração
+        alive_by_type = np.bincount(
+            self.cell_type_id[self.is_alive], minlength=len(self.cell_type_names)
+        ).tolist()
+
+        type_stats = {
+            cell_type: {"total": total, "alive": alive, "dead": total - alive}
+            for cell_type, total, alive in zip(
+                self.cell_type_names, self._type_totals, alive_by_type
+            )
+        }
 
         return {
             "total_cells": total_cells,
@@ -246,7 +461,7 @@ class RetinaSim:
         """Representação em string da retina."""
         return (
             f"RetinaSim(width={self.width}, height={self.height}, depth={self.depth}, "
-            f"num_cells={len(self.cells)}, alive={self.get_alive_cells_count()})"
+            f"num_cells={self.health.size}, alive={self.get_alive_cells_count()})"
         )
 
 
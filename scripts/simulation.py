@@ -17,8 +17,30 @@ from scripts.config import (
     CELL_DEATH_RATE_SEVERE,
     CELL_MIGRATION_RATE,
     NOISE_LEVEL,
+    TIME_STEPS,
 )
 from scripts.retina import RetinaSim
+from scripts.kernels import run_steps, run_ensemble, sample_alive, drop_dead
+
+
+def _ensure_capacity(buffer: np.ndarray, length: int, needed: int) -> np.ndarray:
+    """
+    Retorna um buffer com espaço para needed valores, preservando os length primeiros.
+    
+    Args:
+        buffer (np.ndarray): Buffer atual.
+        length (int): Número de valores já registrados.
+        needed (int): Capacidade mínima necessária.
+    
+    Returns:
+        np.ndarray: O próprio buffer, se couber, ou uma cópia ampliada
+            (pelo menos o dobro do tamanho atual).
+    """
+    if needed <= buffer.size:
+        return buffer
+    grown = np.empty(max(needed, 2 * buffer.size), dtype=buffer.dtype)
+    grown[:length] = buffer[:length]
+    return grown
 
 
 class GlaucomaSimulator:
@@ -34,6 +56,8 @@ class GlaucomaSimulator:
         retina: RetinaSim,
         initial_iop: float = INITIAL_IOP,
         simulation_step: int = 0,
+        rng: Optional[np.random.Generator] = None,
+        num_steps: Optional[int] = None,
     ):
         """
         Inicializa o simulador de glaucoma.
@@ -42,14 +66,115 @@ class GlaucomaSimulator:
             retina (RetinaSim): Instância da retina a ser simulada.
             initial_iop (float): Pressão intraocular inicial em mmHg.
             simulation_step (int): Passo inicial de simulação.
+            rng (Optional[np.random.Generator]): Gerador de números aleatórios.
+                Se None, cria um novo gerador sem seed fixa.
+            num_steps (Optional[int]): Número de passos previsto, usado para
+                pré-alocar os históricos de IOP e mortalidade. Se None, usa TIME_STEPS.
         """
         self.retina = retina
         self.initial_iop = initial_iop
         self.current_iop = initial_iop
         self.simulation_step = simulation_step
-        self.iop_history: List[float] = [initial_iop]
-        self.mortality_history: List[float] = []
+        # Históricos em buffers float32 pré-alocados (crescem ao encher)
+        capacity = num_steps or TIME_STEPS
+        self._iop_buffer = np.empty(capacity + 1, dtype=np.float32)
+        self._iop_buffer[0] = initial_iop
+        self._iop_len = 1
+        # Estatísticas acumuladas do histórico de IOP (sumário em O(1))
+        first_iop = float(self._iop_buffer[0])
+        self._iop_sum = first_iop
+        self._iop_min = first_iop
+        self._iop_max = first_iop
+        self._mortality_buffer = np.empty(capacity, dtype=np.float32)
+        self._mortality_len = 0
         self.treatment_active = False
+        self._rng = rng if rng is not None else np.random.default_rng()
+        # Índices das células vivas em _alive_ids[:_n_alive_ids] (ordem livre)
+        self._alive_ids = np.empty(0, dtype=np.intp)
+        self._n_alive_ids = 0
+        self._alive_ids_version = -1  # retina.version refletida em _alive_ids
+
+    @property
+    def iop_history(self) -> np.ndarray:
+        """
+        Histórico de IOP registrado até o passo atual.
+        
+        Returns:
+            np.ndarray: View float32 do buffer pré-alocado (n_passos + 1 valores).
+        """
+        return self._iop_buffer[: self._iop_len]
+
+    @property
+    def mortality_history(self) -> np.ndarray:
+        """
+        Histórico da taxa de mortalidade, um valor por passo executado.
+        
+        Returns:
+            np.ndarray: View float32 do buffer pré-alocado (n_passos valores).
+        """
+        return self._mortality_buffer[: self._mortality_len]
+
+    def _reserve(self, num_steps: int) -> None:
+        """
+        Garante espaço nos históricos para mais num_steps passos.
+        
+        Args:
+            num_steps (int): Número de passos que serão registrados.
+        """
+        self._iop_buffer = _ensure_capacity(
+            self._iop_buffer, self._iop_len, self._iop_len + num_steps
+        )
+        self._mortality_buffer = _ensure_capacity(
+            self._mortality_buffer, self._mortality_len, self._mortality_len + num_steps
+        )
+
+    def _record_iop(self, iop: float) -> None:
+        """
+        Registra um valor de IOP no histórico.
+        
+        Args:
+            iop (float): Pressão intraocular a registrar.
+        """
+        self._iop_buffer = _ensure_capacity(self._iop_buffer, self._iop_len, self._iop_len + 1)
+        self._iop_buffer[self._iop_len] = iop
+        # Acumula o valor como armazenado (float32)
+        stored = float(self._iop_buffer[self._iop_len])
+        self._iop_sum += stored
+        self._iop_min = min(self._iop_min, stored)
+        self._iop_max = max(self._iop_max, stored)
+        self._iop_len += 1
+
+    def _record_mortality(self, mortality: float) -> None:
+        """
+        Registra a taxa de mortalidade de um passo no histórico.
+        
+        Args:
+            mortality (float): Taxa de mortalidade ao fim do passo.
+        """
+        self._mortality_buffer = _ensure_capacity(
+            self._mortality_buffer, self._mortality_len, self._mortality_len + 1
+        )
+        self._mortality_buffer[self._mortality_len] = mortality
+        self._mortality_len += 1
+
+    def _record_steps(self, iops: np.ndarray, mortality: np.ndarray) -> None:
+        """
+        Registra a IOP e a taxa de mortalidade de vários passos de uma só vez.
+        
+        Args:
+            iops (np.ndarray): Pressões intraoculares de cada passo, em ordem.
+            mortality (np.ndarray): Taxas de mortalidade de cada passo.
+        """
+        self._reserve(iops.size)
+        if iops.size:
+            stored = self._iop_buffer[self._iop_len : self._iop_len + iops.size]
+            stored[:] = iops
+            self._iop_sum += float(stored.sum(dtype=np.float64))
+            self._iop_min = min(self._iop_min, float(stored.min()))
+            self._iop_max = max(self._iop_max, float(stored.max()))
+            self._iop_len += iops.size
+        self._mortality_buffer[self._mortality_len : self._mortality_len + mortality.size] = mortality
+        self._mortality_len += mortality.size
 
     def _calculate_cell_death_rate(self, iop: float) -> float:
         """
@@ -71,7 +196,7 @@ class GlaucomaSimulator:
             # Pressão severa
             return CELL_DEATH_RATE_SEVERE
 
-    def simulate_iop_variation(self) -> float:
+    def simulate_iop_variation(self, noise: Optional[float] = None) -> float:
         """
         Simula a variação da pressão intraocular em um passo de tempo.
         
@@ -79,11 +204,17 @@ class GlaucomaSimulator:
         - Componente determinística: tendência geral,
         - Componente estocástica: ruído natural.
         
+        Args:
+            noise (Optional[float]): Ruído pré-sorteado para este passo.
+                Se None, sorteia um novo valor.
+        
         Returns:
             float: Nova pressão intraocular.
         """
+
         # Ruído aleatório para simular flutuações naturais
-        noise = np.random.normal(0, NOISE_LEVEL)
+        if noise is None:
+            noise = self._rng.normal(0, NOISE_LEVEL)
 
         # Mean-reversion: IOP tende a voltar para o valor inicial
         # (com leve deriva se não tratado, redução se tratado)
@@ -97,7 +228,7 @@ class GlaucomaSimulator:
             deterministic_change = 0.15 * (target - self.current_iop)
 
         self.current_iop = max(5.0, self.current_iop + deterministic_change + noise)
-        self.iop_history.append(self.current_iop)
+        self._record_iop(self.current_iop)
 
         return self.current_iop
 
@@ -118,20 +249,25 @@ class GlaucomaSimulator:
         # Calcula quantas células podem sofrer dano
         cells_at_risk = int(alive_cells * death_rate)
 
-        # Seleciona células aleatoriamente para dano (numpy array para performance)
-        alive_cell_ids = np.array(
-            [i for i, cell in enumerate(self.retina.cells) if cell.is_alive]
-        )
-
-        # Seleciona células sem reposição (numpy, O(k) em vez de O(n*k))
-        n_select = min(cells_at_risk, len(alive_cell_ids))
+        # Sorteia por posição no conjunto de IDs vivos (Fisher-Yates parcial)
+        # e remove as mortas por swap-pop: O(células em risco) por passo
         cells_killed = 0
-        if n_select > 0:
-            chosen = np.random.choice(alive_cell_ids, size=n_select, replace=False)
-            damages = np.random.uniform(0.1, 0.5, size=n_select)
-            for cell_id, damage in zip(chosen, damages):
-                if self.retina.damage_cell(int(cell_id), damage):
-                    cells_killed += 1
+        if cells_at_risk > 0:
+            if self._alive_ids_version != self.retina.version:
+                # Vivas alteradas fora deste método: reconstrói o conjunto
+                self._alive_ids = np.flatnonzero(self.retina.is_alive)
+                self._n_alive_ids = self._alive_ids.size
+            n_select = min(cells_at_risk, self._n_alive_ids)
+            chosen = sample_alive(
+                self._alive_ids, self._n_alive_ids, n_select, self._rng.random(n_select)
+            )
+            damages = self._rng.uniform(0.1, 0.5, size=n_select).astype(np.float32)
+            cells_killed = self.retina.damage_cells(chosen, damages)
+            self._n_alive_ids = drop_dead(
+                self._alive_ids, self._n_alive_ids, n_select, self.retina.is_alive
+            )
+            # As mortas deste passo já saíram do conjunto
+            self._alive_ids_version = self.retina.version
 
         return cells_killed
 
@@ -151,7 +287,7 @@ class GlaucomaSimulator:
         """Interrompe o tratamento medico."""
         self.treatment_active = False
 
-    def step(self) -> Dict[str, any]:
+    def step(self, noise: Optional[float] = None) -> Dict[str, any]:
         """
         Executa um passo de simulação.
         
@@ -160,20 +296,23 @@ class GlaucomaSimulator:
         2. Aplicação de dano às células,
         3. Atualização de estatísticas.
         
+        Args:
+            noise (Optional[float]): Ruído de IOP pré-sorteado para este passo.
+                Se None, sorteia um novo valor.
+        
         Returns:
             Dict[str, any]: Dicionário com dados do passo simulado.
         """
         # Simula variação de pressão
-        new_iop = self.simulate_iop_variation()
+        new_iop = self.simulate_iop_variation(noise)
 
         # Aplica dano
         cells_killed = self.apply_pressure_damage()
 
-        # Registra mortalidade
-        current_mortality = self.retina.get_dead_cells_count() / len(
-            self.retina.cells
-        )
-        self.mortality_history.append(current_mortality)
+        # Registra mortalidade (contadores O(1) mantidos pela retina)
+        dead_cells = self.retina.get_dead_cells_count()
+        current_mortality = dead_cells / self.retina.is_alive.size
+        self._record_mortality(current_mortality)
 
         self.simulation_step += 1
 
@@ -182,56 +321,198 @@ class GlaucomaSimulator:
             "iop": self.current_iop,
             "cells_killed_this_step": cells_killed,
             "total_alive_cells": self.retina.get_alive_cells_count(),
-            "total_dead_cells": self.retina.get_dead_cells_count(),
+            "total_dead_cells": dead_cells,
             "mortality_rate": current_mortality,
             "average_health": self.retina.get_average_health(),
         }
 
-    def run_simulation(self, num_steps: int, log_interval: int = 100) -> List[Dict]:
+    def run_simulation(
+        self,
+        num_steps: int,
+        log_interval: int = 100,
+        vectorized: bool = False,
+        verbose: bool = True,
+    ) -> List[Dict]:
         """
         Executa múltiplos passos de simulação.
         
         Args:
             num_steps (int): Número de passos a executar.
             log_interval (int): Intervalo para logging de resultados.
+            vectorized (bool): Se True, executa os passos sobre arrays NumPy
+                (ver _run_vectorized) e retorna apenas os resultados dos
+                checkpoints a cada log_interval passos e do último passo.
+            verbose (bool): Se True, imprime o progresso a cada log_interval.
         
         Returns:
-            List[Dict]: Lista de resultados para cada passo.
+            List[Dict]: Lista de resultados para cada passo (ou de cada
+                checkpoint, no modo vetorizado).
         """
-        results = []
+        self._reserve(num_steps)
+        if vectorized:
+            # O kernel roda todos os passos de uma vez: imprime os checkpoints ao final
+            results = self._run_vectorized(num_steps, log_interval)
+            if verbose:
+                for step_result in results:
+                    if (step_result["step"] % log_interval) == 0:
+                        self._log_step(step_result)
+            return results
 
-        for _ in range(num_steps):
-            step_result = self.step()
+        # Ruído de todos os passos sorteado de uma vez
+        noise = self._rng.normal(0, NOISE_LEVEL, size=num_steps).tolist()
+        results = []
+        for n in noise:
+            step_result = self.step(n)
             results.append(step_result)
-
-            if (self.simulation_step % log_interval) == 0:
-                print(
-                    f"Step {self.simulation_step}: IOP={step_result['iop']:.1f} mmHg, "
-                    f"Alive={step_result['total_alive_cells']}, "
-                    f"Mortality={step_result['mortality_rate']:.2%}"
-                )
+            # Progresso impresso durante a execução; só formata a cada log_interval
+            if verbose and (step_result["step"] % log_interval) == 0:
+                self._log_step(step_result)
 
         return results
 
+    @staticmethod
+    def _log_step(step_result: Dict) -> None:
+        """
+        Imprime uma linha de progresso da simulação.
+        
+        Args:
+            step_result (Dict): Resultado de um passo (chaves de step()).
+        """
+        print(
+            f"Step {step_result['step']}: IOP={step_result['iop']:.1f} mmHg, "
+            f"Alive={step_result['total_alive_cells']}, "
+            f"Mortality={step_result['mortality_rate']:.2%}"
+        )
+
+    def _run_vectorized(self, num_steps: int, checkpoint_interval: int) -> List[Dict]:
+        """
+        Executa passos de simulação sobre arrays NumPy.
+        
+        Todo o laço de passos roda no kernel run_steps (Numba quando
+        disponível), que modifica in-place os arrays de saúde e vitalidade
+        da retina. O ruído de IOP de todos os passos é sorteado em uma única
+        chamada e o kernel devolve, por passo, a IOP, as contagens de
+        células e a soma da saúde, usadas para montar os checkpoints.
+        
+        Args:
+            num_steps (int): Número de passos a executar.
+            checkpoint_interval (int): Intervalo entre resultados registrados.
+        
+        Returns:
+            List[Dict]: Resultados dos checkpoints (mesmas chaves de step()).
+        """
+        total_cells = self.retina.is_alive.size
+        noise = self._rng.normal(0, NOISE_LEVEL, size=num_steps)
+        seed = int(self._rng.integers(2**32))
+
+        self.current_iop, iops, alive_counts, killed, health_sums = run_steps(
+            self.retina.health,
+            self.retina.is_alive,
+            noise,
+            seed,
+            self.current_iop,
+            self.initial_iop,
+            self.treatment_active,
+            NORMAL_IOP_RANGE[1],
+            PRESSURE_DAMAGE_THRESHOLD,
+            (CELL_DEATH_RATE_NORMAL, CELL_DEATH_RATE_ELEVATED_IOP, CELL_DEATH_RATE_SEVERE),
+        )
+        mortality = (total_cells - alive_counts) / total_cells
+        self._record_steps(iops, mortality)
+
+        first_step = self.simulation_step + 1
+        self.simulation_step += num_steps
+
+        checkpoints = []
+        for t in range(num_steps):
+            step = first_step + t
+            if step % checkpoint_interval == 0 or t == num_steps - 1:
+                alive_count = int(alive_counts[t])
+                checkpoints.append({
+                    "step": step,
+                    "iop": float(iops[t]),
+                    "cells_killed_this_step": int(killed[t]),
+                    "total_alive_cells": alive_count,
+                    "total_dead_cells": total_cells - alive_count,
+                    "mortality_rate": float(mortality[t]),
+                    "average_health": (
+                        float(health_sums[t] / alive_count) if alive_count else 0.0
+                    ),
+                })
+
+        # O kernel alterou os arrays diretamente e já acompanhou os totais
+        if num_steps > 0:
+            self.retina.update_counters(int(alive_counts[-1]), float(health_sums[-1]))
+
+        return checkpoints
+
+    def run_ensemble(self, num_replicates: int, num_steps: int) -> Dict[str, np.ndarray]:
+        """
+        Executa réplicas independentes da simulação a partir do estado atual.
+        
+        Cada réplica sorteia seu próprio ruído de IOP e sua própria semente;
+        com Numba, as réplicas rodam em paralelo. O estado do simulador e da
+        retina não é alterado.
+        
+        Args:
+            num_replicates (int): Número de réplicas.
+            num_steps (int): Número de passos de cada réplica.
+        
+        Returns:
+            Dict[str, np.ndarray]: Trajetórias com shape (num_replicates,
+                num_steps) para "iop", "alive_cells", "cells_killed",
+                "mortality_rate" e "average_health".
+        """
+        total_cells = self.retina.is_alive.size
+        noise = self._rng.normal(0, NOISE_LEVEL, size=(num_replicates, num_steps))
+        seeds = self._rng.integers(2**32, size=num_replicates)
+
+        iops, alive_counts, killed, health_sums = run_ensemble(
+            self.retina.health,
+            self.retina.is_alive,
+            noise,
+            seeds,
+            self.current_iop,
+            self.initial_iop,
+            self.treatment_active,
+            NORMAL_IOP_RANGE[1],
+            PRESSURE_DAMAGE_THRESHOLD,
+            (CELL_DEATH_RATE_NORMAL, CELL_DEATH_RATE_ELEVATED_IOP, CELL_DEATH_RATE_SEVERE),
+        )
+
+        return {
+            "iop": iops,
+            "alive_cells": alive_counts,
+            "cells_killed": killed,
+            "mortality_rate": (total_cells - alive_counts) / total_cells,
+            "average_health": np.divide(
+                health_sums, alive_counts, out=np.zeros_like(health_sums), where=alive_counts > 0
+            ),
+        }
+
     def get_summary(self) -> Dict[str, any]:
         """
         Retorna um sumário dos resultados da simulação.
         
+        Todos os campos são O(1): as estatísticas de IOP vêm de acumuladores
+        atualizados a cada registro e as contagens de células dos contadores
+        mantidos pela retina, então o sumário é montado a cada chamada.
+        
         Returns:
             Dict[str, any]: Dicionário com resumo da simulação.
         """
         return {
             "total_steps": self.simulation_step,
             "final_iop": self.current_iop,
-            "mean_iop": np.mean(self.iop_history),
-            "max_iop": np.max(self.iop_history),
-            "min_iop": np.min(self.iop_history),
+            "mean_iop": self._iop_sum / self._iop_len,
+            "max_iop": self._iop_max,
+            "min_iop": self._iop_min,
             "treatment_active": self.treatment_active,
             "final_mortality_rate": (
-                self.retina.get_dead_cells_count() / len(self.retina.cells)
+                self.retina.get_dead_cells_count() / self.retina.is_alive.size
             ),
             "final_average_health": self.retina.get_average_health(),
-            "total_cells": len(self.retina.cells),
+            "total_cells": int(self.retina.is_alive.size),
             "alive_cells": self.retina.get_alive_cells_count(),
             "dead_cells": self.retina.get_dead_cells_count(),
         }
@@ -7,19 +7,72 @@ evolução temporal e gráficos analíticos dos resultados da simulação.
 
 import numpy as np
 from typing import Optional, Dict, List, Tuple
-from scripts.config import FIGURE_DPI, FIGURE_SIZE, COLORMAP_RETINA, COLORMAP_DAMAGE, SCENARIO_NORMAL, SCENARIO_GLAUCOMA
+from scripts.config import (
+    FIGURE_DPI,
+    FIGURE_SIZE,
+    PNG_COMPRESS_LEVEL,
+    MAX_SCATTER_POINTS,
+    COLORMAP_RETINA,
+    COLORMAP_DAMAGE,
+    SCENARIO_NORMAL,
+    SCENARIO_GLAUCOMA,
+)
 from scripts.retina import RetinaSim
 from scripts.simulation import GlaucomaSimulator
 
-try:
-    import matplotlib.pyplot as plt
-    from mpl_toolkits.mplot3d import Axes3D
-    import matplotlib.patches as mpatches
+# Matplotlib é importado apenas no primeiro gráfico (ver _lazy_mpl)
+plt = None
+MATPLOTLIB_AVAILABLE: Optional[bool] = None
 
-    MATPLOTLIB_AVAILABLE = True
-except ImportError:
-    MATPLOTLIB_AVAILABLE = False
-    print("Aviso: Matplotlib não está instalado.")
+
+def _lazy_mpl() -> bool:
+    """
+    Importa o matplotlib na primeira chamada.
+    
+    Returns:
+        bool: True se o matplotlib estiver disponível.
+    """
+    global plt, MATPLOTLIB_AVAILABLE
+    if MATPLOTLIB_AVAILABLE is None:
+        try:
+            import matplotlib.pyplot as pyplot
+            from mpl_toolkits.mplot3d import Axes3D  # registra a projeção "3d"
+
+            plt = pyplot
+            MATPLOTLIB_AVAILABLE = True
+        except ImportError:
+            MATPLOTLIB_AVAILABLE = False
+            print("Aviso: Matplotlib não está instalado.")
+    return MATPLOTLIB_AVAILABLE
+
+
+def health_grid_2d(retina: RetinaSim, z_slice: float) -> np.ndarray:
+    """
+    Calcula a saúde média das células por posição do grid em um corte em z.
+    
+    Usa as células com |z - z_slice| < depth / 10 (faixa contígua, pois as
+    células estão ordenadas por z) e agrupa pelo índice linear do grid
+    pré-calculado na retina, com dois np.bincount.
+    
+    Args:
+        retina (RetinaSim): Instância da retina.
+        z_slice (float): Profundidade do corte.
+    
+    Returns:
+        np.ndarray: Grid (height, width) com a saúde média; 0 onde não há células.
+    """
+    tolerance = retina.depth / 10
+    band = retina.z_band(z_slice - tolerance, z_slice + tolerance)
+
+    # Histograma 2D via bincount sobre o índice linear pré-calculado
+    shape = (retina.height, retina.width)
+    flat_idx = retina.grid_index[band]
+    sums = np.bincount(
+        flat_idx, weights=retina.health[band], minlength=retina.height * retina.width
+    ).reshape(shape)
+    counts = np.bincount(flat_idx, minlength=retina.height * retina.width).reshape(shape)
+
+    return np.divide(sums, counts, out=np.zeros(shape), where=counts > 0)
 
 
 class RetinaVisualizer:
@@ -40,17 +93,15 @@ class RetinaVisualizer:
         """
         self.dpi = dpi
         self.figsize = figsize
-        self.matplotlib_available = MATPLOTLIB_AVAILABLE
 
-        if not self.matplotlib_available:
-            print(
-                "Aviso: Matplotlib não está disponível. "
-                "Visualizações não funcionarão."
-            )
+    @property
+    def matplotlib_available(self) -> bool:
+        """Indica se o matplotlib está disponível (importando-o na primeira consulta)."""
+        return _lazy_mpl()
 
     def plot_retina_3d(
         self, retina: RetinaSim, show_only_alive: bool = True, title: str = "Retina 3D"
-    ) -> Optional[plt.Figure]:
+    ) -> Optional["plt.Figure"]:
         """
         Plota a retina em 3D com cores baseadas em saúde celular.
         
@@ -68,26 +119,29 @@ class RetinaVisualizer:
         fig = plt.figure(figsize=self.figsize, dpi=self.dpi)
         ax = fig.add_subplot(111, projection="3d")
 
-        # Filtra células
-        cells_to_plot = (
-            [c for c in retina.cells if c.is_alive]
-            if show_only_alive
-            else retina.cells
-        )
+        # A máscara é convertida em índices uma única vez; os quatro arrays
+        # são então lidos por índice, sem refazer a varredura da máscara
+        ids = np.flatnonzero(retina.is_alive) if show_only_alive else None
+        num_points = retina.health.size if ids is None else ids.size
 
-        if not cells_to_plot:
+        if num_points == 0:
             ax.text2D(0.5, 0.5, "Nenhuma célula para visualizar")
             return fig
 
-        # Extrai coordenadas e saúde
-        x = [c.x for c in cells_to_plot]
-        y = [c.y for c in cells_to_plot]
-        z = [c.z for c in cells_to_plot]
-        health = [c.health for c in cells_to_plot]
+        # Retinas grandes: amostra fixa de pontos (figura reprodutível)
+        if num_points > MAX_SCATTER_POINTS:
+            sel = np.random.default_rng(0).choice(num_points, MAX_SCATTER_POINTS, replace=False)
+            ids = sel if ids is None else ids[sel]
 
-        # Plota pontos
+        if ids is None:
+            x, y, z, health = retina.x, retina.y, retina.z, retina.health
+        else:
+            x, y, z, health = retina.x[ids], retina.y[ids], retina.z[ids], retina.health[ids]
+
+        # Pontos rasterizados e sem contorno: evita traçar um caminho por célula
         scatter = ax.scatter(
-            x, y, z, c=health, cmap=COLORMAP_RETINA, s=20, alpha=0.6, edgecolors="k"
+            x, y, z, c=health, cmap=COLORMAP_RETINA, s=20, alpha=0.6,
+            edgecolors="none", linewidths=0, rasterized=True,
         )
 
         ax.set_xlabel("X (Largura)")
@@ -106,7 +160,7 @@ class RetinaVisualizer:
         retina: RetinaSim,
         z_slice: Optional[float] = None,
         title: str = "Mapa de Saúde Celular (2D)",
-    ) -> Optional[plt.Figure]:
+    ) -> Optional["plt.Figure"]:
         """
         Plota um mapa 2D de saúde celular em um corte da retina.
         
@@ -125,23 +179,7 @@ class RetinaVisualizer:
         if z_slice is None:
             z_slice = retina.depth / 2
 
-        # Cria grid
-        grid = np.zeros((retina.height, retina.width))
-        counts = np.zeros((retina.height, retina.width))
-
-        # Agrupa células por proximidade ao corte
-        tolerance = retina.depth / 10
-        for cell in retina.cells:
-            if abs(cell.z - z_slice) < tolerance:
-                x_idx = int((cell.x / retina.width) * (retina.width - 1))
-                y_idx = int((cell.y / retina.height) * (retina.height - 1))
-
-                grid[y_idx, x_idx] += cell.health
-                counts[y_idx, x_idx] += 1
-
-        # Calcula média
-        valid_mask = counts > 0
-        grid[valid_mask] /= counts[valid_mask]
+        grid = health_grid_2d(retina, z_slice)
 
         # Plota
         fig, ax = plt.subplots(figsize=self.figsize, dpi=self.dpi)
@@ -161,7 +199,7 @@ class RetinaVisualizer:
         simulator: GlaucomaSimulator,
         show_metrics: List[str] = None,
         title: str = "Evolução Temporal da Simulação",
-    ) -> Optional[plt.Figure]:
+    ) -> Optional["plt.Figure"]:
         """
         Plota a evolução temporal de métricas da simulação.
         
@@ -225,7 +263,7 @@ class RetinaVisualizer:
 
     def plot_cell_type_distribution(
         self, retina: RetinaSim, title: str = "Distribuição de Tipos de Células"
-    ) -> Optional[plt.Figure]:
+    ) -> Optional["plt.Figure"]:
         """
         Plota a distribuição de tipos de células.
         
@@ -268,7 +306,7 @@ class RetinaVisualizer:
         self,
         iop_history: List[float],
         title: str = "Distribuição de Pressão Intraocular",
-    ) -> Optional[plt.Figure]:
+    ) -> Optional["plt.Figure"]:
         """
         Plota o histograma de pressão intraocular ao longo do tempo.
         
@@ -301,7 +339,7 @@ class RetinaVisualizer:
         simulators: List,
         labels: List[str],
         title: str = "Comparação de Cenários",
-    ) -> Optional[plt.Figure]:
+    ) -> Optional["plt.Figure"]:
         """
         Plota comparação de múltiplos cenários de simulação.
 
@@ -359,7 +397,7 @@ class RetinaVisualizer:
         retinas: List,
         labels: List[str],
         title: str = "Sobrevivência Celular por Cenário",
-    ) -> Optional[plt.Figure]:
+    ) -> Optional["plt.Figure"]:
         """
         Plota barras de sobrevivência celular final de múltiplos cenários.
 
@@ -412,23 +450,29 @@ class RetinaVisualizer:
         plt.tight_layout()
         return fig
 
-    def save_figure(self, fig: plt.Figure, filepath: str) -> None:
+    def save_figure(self, fig: "plt.Figure", filepath: str) -> None:
         """
         Salva uma figura em arquivo.
         
+        PNGs são gravados com compressão PNG_COMPRESS_LEVEL, bem mais barata
+        em CPU que o nível padrão do zlib, com arquivos pouco maiores.
+        
         Args:
             fig (plt.Figure): Figura matplotlib a salvar.
             filepath (str): Caminho completo do arquivo.
         """
         if self.matplotlib_available and fig is not None:
-            fig.savefig(filepath, dpi=self.dpi, bbox_inches="tight")
+            kwargs = {}
+            if filepath.lower().endswith(".png"):
+                kwargs["pil_kwargs"] = {"compress_level": PNG_COMPRESS_LEVEL}
+            fig.savefig(filepath, dpi=self.dpi, bbox_inches="tight", **kwargs)
             print(f"Figura salva em: {filepath}")
 
 
 if __name__ == "__main__":
     print("Teste do módulo de visualização...\n")
 
-    if MATPLOTLIB_AVAILABLE:
+    if _lazy_mpl():
         # Cria retina e simulador para teste
         retina = RetinaSim()
         simulator = GlaucomaSimulator(retina)
@@ -7,6 +7,10 @@ dos componentes principais do projeto.
 
 import sys
 import os
+import contextlib
+import io
+import pickle
+import tempfile
 import numpy as np
 
 # Adicionar raiz ao path
@@ -16,6 +20,11 @@ from scripts.config import get_config, TOTAL_CELLS
 from scripts.retina import RetinaSim, Cell
 from scripts.simulation import GlaucomaSimulator
 from scripts.ai_model import SimplePredictor
+import utils
+from utils import load_or_generate_arrays, load_simulation_results, save_simulation_results
+import scripts.kernels as kernels
+from main import run_scenario
+from scripts.visualization import health_grid_2d
 
 
 class TestRetinaSim:
@@ -39,10 +48,10 @@ class TestRetinaSim:
         print("Teste 2: Limites de coordenadas...")
         retina = RetinaSim()
 
-        for cell in retina.cells:
-            assert 0 <= cell.x <= retina.width, f"X fora dos limites: {cell.x}"
-            assert 0 <= cell.y <= retina.height, f"Y fora dos limites: {cell.y}"
-            assert 0 <= cell.z <= retina.depth, f"Z fora dos limites: {cell.z}"
+        assert np.all((retina.x >= 0) & (retina.x <= retina.width)), "X fora dos limites"
+        assert np.all((retina.y >= 0) & (retina.y <= retina.height)), "Y fora dos limites"
+        assert np.all((retina.z >= 0) & (retina.z <= retina.depth)), "Z fora dos limites"
+        assert np.all(np.diff(retina.z) >= 0), "Células deveriam estar ordenadas por Z"
 
         print("  ✓ Coordenadas OK")
 
@@ -79,8 +88,111 @@ class TestRetinaSim:
         assert stats["mortality_rate"] == 0.0, "Taxa de mortalidade deveria ser 0"
         assert 0 <= stats["average_health"] <= 1.0, "Saúde média inválida"
 
+        # Matar todas as gliais e metade das ganglionares: contagens por tipo
+        glial = retina.get_cell_ids_by_type("glial")
+        ganglion = retina.get_cell_ids_by_type("ganglion")[::2]
+        retina.damage_cells(np.concatenate([glial, ganglion]), np.full(glial.size + ganglion.size, 2.0))
+        by_type = retina.get_statistics()["by_type"]
+
+        assert sum(t["total"] for t in by_type.values()) == TOTAL_CELLS, "Totais por tipo incorretos"
+        assert by_type["glial"] == {"total": glial.size, "alive": 0, "dead": glial.size}, "Gliais incorretas"
+        assert by_type["ganglion"]["dead"] == ganglion.size, "Ganglionares mortas incorretas"
+        for cell_type in ("photoreceptor", "bipolar"):
+            assert by_type[cell_type]["dead"] == 0, f"{cell_type} não deveria ter mortes"
+            assert by_type[cell_type]["alive"] == len(retina.get_cells_by_type(cell_type)), f"{cell_type} incorreto"
+
         print("  ✓ Estatísticas OK")
 
+    @staticmethod
+    def test_cell_arrays():
+        """Testa que os arrays da retina e a visão de células concordam."""
+        print("Teste 13: Arrays de células...")
+        retina = RetinaSim(num_cells=100)
+
+        retina.damage_cell(3, 1.0)
+        retina.damage_cell(5, 0.25)
+
+        assert retina.health.dtype == np.float32, "Saúde deve ser float32"
+        assert not retina.is_alive[3], "Célula 3 deveria estar morta"
+        assert retina.get_cell_coordinates().shape == (99, 3), "Coordenadas de vivas incorretas"
+        cell = retina.cells[5]
+        assert cell.health == 0.75 and cell.is_alive, "Visão Cell diverge dos arrays"
+        assert (cell.x, cell.y, cell.z) == (retina.x[5], retina.y[5], retina.z[5]), "Posição incorreta"
+        assert np.isclose(
+            retina.get_average_health(), retina.health[retina.is_alive].mean()
+        ), "Contador de saúde dessincronizado"
+
+        copy = pickle.loads(pickle.dumps(retina))
+        assert copy.x.base is not None and copy.x.base is copy.z.base, "X e Z deveriam ser visões da mesma matriz"
+        assert np.array_equal(copy.z, retina.z), "Coordenadas perdidas no pickle"
+
+        print("  ✓ Arrays de células OK")
+
+    @staticmethod
+    def test_batch_damage():
+        """Testa dano e cura em lote."""
+        print("Teste 14: Dano e cura em lote...")
+        retina = RetinaSim(num_cells=100)
+
+        killed = retina.damage_cells(np.array([1, 2, 3]), np.array([0.5, 1.0, 2.0]))
+        retina.heal_cells(np.array([1, 2]), 0.25)
+
+        assert killed == 2, "Duas células deveriam morrer"
+        assert retina.get_alive_cells_count() == 98, "Contagem de vivas incorreta"
+        assert retina.health[1] == 0.75, "Cura não aplicada"
+        assert not retina.is_alive[2], "Cura não deve reviver célula morta"
+        assert np.isclose(
+            retina.get_average_health(), retina.health[retina.is_alive].mean()
+        ), "Contador de saúde dessincronizado"
+
+        print("  ✓ Dano e cura em lote OK")
+
+    @staticmethod
+    def test_z_band():
+        """Testa a seleção por faixa de profundidade nas bordas da faixa."""
+        print("Teste 19: Faixa de profundidade...")
+        retina = RetinaSim(num_cells=1000, rng=np.random.default_rng(3))
+        z = retina.z
+        ids = np.arange(z.size)
+
+        # Limites iguais ao z de células existentes: a faixa é aberta
+        for z_min, z_max in [(z[100], z[900]), (z[0], z[-1]), (-1.0, retina.depth + 1), (z[500], z[500])]:
+            band = retina.z_band(z_min, z_max)
+            expected = np.flatnonzero((z > z_min) & (z < z_max))
+            assert np.array_equal(ids[band], expected), f"Faixa incorreta para ({z_min}, {z_max})"
+        assert 100 not in ids[retina.z_band(z[100], z[900])], "Borda inferior deveria ser exclusiva"
+        assert ids[retina.z_band(z[600], z[400])].size == 0, "Faixa invertida deveria ser vazia"
+
+        print("  ✓ Faixa de profundidade OK")
+
+    @staticmethod
+    def test_health_grid_2d():
+        """Testa o mapa 2D de saúde contra um laço por célula."""
+        print("Teste 20: Mapa 2D de saúde...")
+        retina = RetinaSim(num_cells=3000, rng=np.random.default_rng(5))
+        retina.damage_cells(np.arange(0, 3000, 3), np.linspace(0.1, 1.5, 1000))
+        z_slice = retina.depth / 2
+        tolerance = retina.depth / 10
+
+        # Referência: fórmula original, célula a célula
+        sums = np.zeros((retina.height, retina.width))
+        counts = np.zeros((retina.height, retina.width))
+        for cell in retina.cells:
+            if abs(cell.z - z_slice) < tolerance:
+                x = int((cell.x / retina.width) * (retina.width - 1))
+                y = int((cell.y / retina.height) * (retina.height - 1))
+                sums[y, x] += cell.health
+                counts[y, x] += 1
+        expected = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+
+        grid = health_grid_2d(retina, z_slice)
+
+        assert grid.shape == (retina.height, retina.width), "Formato do grid incorreto"
+        assert np.allclose(grid, expected), "Grid diverge da referência por célula"
+        assert counts.sum() > 0 and np.any((grid > 0) & (grid < 1)), "Corte deveria conter células danificadas"
+
+        print("  ✓ Mapa 2D de saúde OK")
+
 
 class TestGlaucomaSimulator:
     """Testes para a classe GlaucomaSimulator."""
@@ -144,8 +256,154 @@ class TestGlaucomaSimulator:
         summary = simulator.get_summary()
         assert summary["total_steps"] == 50, "Total de passos incorreto"
 
+        # O sumário deve refletir alterações feitas diretamente na retina
+        retina.damage_cell(int(np.flatnonzero(retina.is_alive)[0]), 2.0)
+        assert simulator.get_summary()["dead_cells"] == summary["dead_cells"] + 1, "Sumário desatualizado"
+
         print("  ✓ Simulação completa OK")
 
+    @staticmethod
+    def test_iop_history_buffer():
+        """Testa crescimento do histórico de IOP pré-alocado."""
+        print("Teste 11: Histórico de IOP pré-alocado...")
+        retina = RetinaSim(num_cells=100)
+        simulator = GlaucomaSimulator(retina, num_steps=5)
+
+        simulator.run_simulation(num_steps=20, log_interval=100)
+
+        assert isinstance(simulator.iop_history, np.ndarray), "Histórico deveria ser um array NumPy"
+        assert len(simulator.iop_history) == 21, "Histórico deveria ter 21 entradas"
+        assert simulator.iop_history[0] == simulator.initial_iop, "Primeira entrada deveria ser a IOP inicial"
+        assert isinstance(simulator.mortality_history, np.ndarray), "Mortalidade deveria ser um array NumPy"
+        assert len(simulator.mortality_history) == 20, "Mortalidade deveria ter 20 entradas"
+
+        print("  ✓ Histórico de IOP OK")
+
+    @staticmethod
+    def test_ensemble():
+        """Testa réplicas independentes da simulação."""
+        print("Teste 15: Ensemble de simulações...")
+        retina = RetinaSim(num_cells=100)
+        simulator = GlaucomaSimulator(retina, initial_iop=35.0)
+
+        ensemble = simulator.run_ensemble(num_replicates=3, num_steps=10)
+
+        assert ensemble["iop"].shape == (3, 10), "Formato das trajetórias incorreto"
+        assert np.all(np.diff(ensemble["alive_cells"], axis=1) <= 0), "Células vivas não podem aumentar"
+        assert retina.get_alive_cells_count() == 100, "Ensemble não deve alterar a retina"
+        assert simulator.simulation_step == 0, "Ensemble não deve avançar o simulador"
+
+        print("  ✓ Ensemble OK")
+
+    @staticmethod
+    def test_vectorized_backends():
+        """Testa o kernel run_steps (Numba e NumPy) contra uma recontagem completa."""
+        print("Teste 17: Simulação vetorizada (backends)...")
+        backends = [False, True] if kernels.NUMBA_AVAILABLE else [False]
+        try:
+            for use_numba in backends:
+                kernels.NUMBA_AVAILABLE = use_numba
+                retina = RetinaSim(num_cells=2000, rng=np.random.default_rng(0))
+                simulator = GlaucomaSimulator(retina, initial_iop=35.0, rng=np.random.default_rng(1))
+
+                results = simulator.run_simulation(num_steps=40, log_interval=10, vectorized=True, verbose=False)
+
+                alive = retina.get_alive_cells_count()
+                average = retina.get_average_health()
+                assert alive < 2000, "Deveria haver mortes com IOP elevada"
+                assert alive == int(retina.is_alive.sum()), "Contagem de vivas diverge da recontagem"
+                assert np.isclose(
+                    average, retina.health[retina.is_alive].mean(dtype=np.float64)
+                ), "Saúde média diverge da recontagem"
+                assert not np.any(retina.health[~retina.is_alive] > 0), "Célula morta com saúde positiva"
+                retina.update_counters()
+                assert retina.get_alive_cells_count() == alive, "update_counters alterou as vivas"
+                assert np.isclose(retina.get_average_health(), average), "update_counters alterou a saúde"
+
+                assert [r["step"] for r in results] == [10, 20, 30, 40], "Checkpoints incorretos"
+                assert results[-1]["total_alive_cells"] == alive, "Último checkpoint diverge da retina"
+                assert len(simulator.iop_history) == 41, "Histórico de IOP deveria ter 41 entradas"
+                assert len(simulator.mortality_history) == 40, "Histórico de mortalidade deveria ter 40 entradas"
+        finally:
+            kernels.NUMBA_AVAILABLE = backends[-1]
+
+        print("  ✓ Simulação vetorizada OK")
+
+    @staticmethod
+    def test_scenario_treatment_blocks():
+        """Testa o cenário em dois blocos vetorizados (antes/depois do tratamento)."""
+        print("Teste 18: Cenário com tratamento...")
+        for treatment_at, expect_treatment in [(60, True), (0, False), (120, False), (500, False)]:
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                sim, retina = run_scenario("Teste", 35.0, 120, treatment_at=treatment_at)
+            log = output.getvalue()
+
+            assert sim.simulation_step == 120, f"Deveria executar 120 passos (treatment_at={treatment_at})"
+            assert len(sim.mortality_history) == 120, "Histórico de mortalidade incompleto"
+            assert "Step 50:" in log and "Step 100:" in log, "Checkpoints não registrados"
+            assert sim.treatment_active == expect_treatment, f"Tratamento incorreto (treatment_at={treatment_at})"
+            assert ("Tratamento iniciado" in log) == expect_treatment, "Mensagem de tratamento incorreta"
+
+        # Com tratamento a IOP converge para a faixa normal
+        assert sim.current_iop > 30.0, "Sem tratamento a IOP deveria seguir elevada"
+        with contextlib.redirect_stdout(io.StringIO()):
+            treated, _ = run_scenario("Teste", 35.0, 120, treatment_at=60)
+        assert treated.current_iop < 25.0, "Com tratamento a IOP deveria cair"
+
+        print("  ✓ Cenário com tratamento OK")
+
+    @staticmethod
+    def test_apply_damage_fallback():
+        """Testa apply_damage sem o kernel Cython (e contra ele, se compilado)."""
+        print("Teste 21: Kernel de dano (fallback NumPy)...")
+        health = np.array([1.0, 0.5, 0.2, 0.0, 0.9], dtype=np.float32)
+        alive = np.array([True, True, True, False, True])
+        chosen = np.array([0, 2, 3, 4])
+        damages = np.array([0.25, 0.3, 0.1, 1.0])
+
+        backends = [False, True] if kernels.CYTHON_AVAILABLE else [False]
+        try:
+            for use_cython in backends:
+                kernels.CYTHON_AVAILABLE = use_cython
+                h, a = health.copy(), alive.copy()
+                killed = kernels.apply_damage(h, a, chosen, damages)
+
+                # Célula 3 já estava morta: não conta como nova morte
+                assert killed == 2, f"Deveriam morrer 2 células (cython={use_cython})"
+                assert np.allclose(h, [0.75, 0.5, 0.0, 0.0, 0.0]), "Saúde incorreta após o dano"
+                assert a.tolist() == [True, True, False, False, False], "Máscara de vivas incorreta"
+        finally:
+            kernels.CYTHON_AVAILABLE = backends[-1]
+
+        print("  ✓ Kernel de dano OK")
+
+    @staticmethod
+    def test_alive_ids_version():
+        """Testa que o conjunto de vivas é reconstruído quando a retina muda."""
+        print("Teste 23: Conjunto de células vivas...")
+        retina = RetinaSim(num_cells=500, rng=np.random.default_rng(2))
+        simulator = GlaucomaSimulator(retina, initial_iop=40.0, rng=np.random.default_rng(4))
+        retina.damage_cell(7, 2.0)
+        simulator.apply_pressure_damage()
+
+        # Revive uma morta e mata uma viva por fora: a contagem não muda
+        revived = int(np.flatnonzero(~retina.is_alive)[0])
+        killed = int(np.flatnonzero(retina.is_alive)[0])
+        alive_before = retina.get_alive_cells_count()
+        retina.is_alive[revived] = True
+        retina.health[revived] = 1.0
+        retina.is_alive[killed] = False
+        retina.health[killed] = 0.0
+        retina.update_counters()
+        assert retina.get_alive_cells_count() == alive_before, "Contagem deveria ser a mesma"
+
+        simulator.apply_pressure_damage()
+        ids = simulator._alive_ids[:simulator._n_alive_ids]
+        assert np.array_equal(np.sort(ids), np.flatnonzero(retina.is_alive)), "Conjunto de vivas desatualizado"
+
+        print("  ✓ Conjunto de células vivas OK")
+
 
 class TestAIModel:
     """Testes para modelos de IA."""
@@ -170,6 +428,22 @@ class TestAIModel:
 
         print("  ✓ Preditor simples OK")
 
+    @staticmethod
+    def test_simple_predictor_batch():
+        """Testa predição em lote do preditor simples."""
+        print("Teste 12: Predição em lote...")
+        predictor = SimplePredictor()
+        iops = np.array([15.0, 25.0, 40.0])
+
+        batch = predictor.predict_from_iop_batch(iops)
+
+        for i, iop in enumerate(iops):
+            single = predictor.predict_from_iop(iop)
+            for key, value in single.items():
+                assert np.isclose(batch[key][i], value), f"{key} difere da predição individual"
+
+        print("  ✓ Predição em lote OK")
+
 
 class TestConfig:
     """Testes para configuração."""
@@ -193,6 +467,65 @@ class TestConfig:
         print("  ✓ Carregamento de configuração OK")
 
 
+class TestUtils:
+    """Testes para utilitários."""
+
+    @staticmethod
+    def test_cached_arrays_params():
+        """Testa que o cache .npz é regerado quando os parâmetros mudam."""
+        print("Teste 16: Cache de arrays com parâmetros...")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "state.npz")
+
+            first = load_or_generate_arrays(path, lambda: {"pts": np.zeros((5, 3))}, {"n": 5})
+            again = load_or_generate_arrays(path, lambda: {"pts": np.ones((7, 3))}, {"n": 5})
+            changed = load_or_generate_arrays(path, lambda: {"pts": np.ones((7, 3))}, {"n": 7})
+
+            assert set(again) == {"pts"}, "Parâmetros não devem aparecer entre os arrays"
+            assert np.array_equal(first["pts"], again["pts"]), "Mesmos parâmetros deveriam reaproveitar o arquivo"
+            assert changed["pts"].shape == (7, 3), "Parâmetros novos deveriam regerar os arrays"
+
+        print("  ✓ Cache de arrays OK")
+
+    @staticmethod
+    def test_results_round_trip():
+        """Testa salvar/carregar resultados com tipos NumPy (orjson e json da stdlib)."""
+        print("Teste 22: Ida e volta dos resultados em JSON...")
+        results = {
+            "iop": np.float64(32.5),
+            "alive": np.int64(4200),
+            "treated": np.bool_(True),
+            "health": np.array([1.0, 0.5, 0.25], dtype=np.float32),
+            "grid": np.arange(6, dtype=np.int32).reshape(2, 3),
+            "history": [{"step": np.int32(10), "iop": np.float32(30.5)}],
+        }
+        expected = {
+            "iop": 32.5,
+            "alive": 4200,
+            "treated": True,
+            "health": [1.0, 0.5, 0.25],
+            "grid": [[0, 1, 2], [3, 4, 5]],
+            "history": [{"step": 10, "iop": 30.5}],
+        }
+
+        backends = [False, True] if utils.ORJSON_AVAILABLE else [False]
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                for use_orjson in backends:
+                    utils.ORJSON_AVAILABLE = use_orjson
+                    path = os.path.join(tmp, f"results_{use_orjson}.json")
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        save_simulation_results(results, path)
+                    loaded = load_simulation_results(path)
+
+                    assert loaded == expected, f"Resultados divergem após ida e volta (orjson={use_orjson})"
+                    assert type(loaded["alive"]) is int, "Inteiros deveriam voltar como int"
+        finally:
+            utils.ORJSON_AVAILABLE = backends[-1]
+
+        print("  ✓ Ida e volta dos resultados OK")
+
+
 def run_all_tests():
     """Executa todos os testes."""
     print("\n" + "=" * 60)
@@ -204,6 +537,7 @@ def run_all_tests():
         TestGlaucomaSimulator,
         TestAIModel,
         TestConfig,
+        TestUtils,
     ]
 
     total_tests = 0
@@ -5,9 +5,44 @@ Contém funções auxiliares reutilizáveis para o projeto.
 """
 
 import os
-from typing import Dict, Any
+from typing import Any, Callable, Dict, Optional
 import json
 
+import numpy as np
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _json_default(obj: Any) -> Any:
+    """Converte tipos NumPy para tipos nativos no fallback com json da stdlib."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Objeto do tipo {type(obj).__name__} não é serializável em JSON")
+
+
+def cpu_supports_bf16() -> bool:
+    """
+    Indica se a CPU tem instruções nativas de bfloat16 (AVX512-BF16/AMX).
+    
+    Lê as flags de /proc/cpuinfo; fora do Linux retorna False.
+    
+    Returns:
+        bool: True se a CPU suporta bfloat16 nativamente.
+    """
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
 
 def create_directories_if_not_exist(paths: list) -> None:
     """
@@ -28,6 +63,9 @@ def save_simulation_results(
     """
     Salva resultados de simulação em arquivo.
     
+    Em JSON, usa o orjson quando instalado (bem mais rápido e com suporte
+    direto a escalares e arrays NumPy); caso contrário, usa o json da stdlib.
+    
     Args:
         results (Dict[str, Any]): Dicionário com resultados.
         filepath (str): Caminho para salvar.
@@ -36,8 +74,14 @@ def save_simulation_results(
     os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
 
     if format == "json":
-        with open(filepath, "w") as f:
-            json.dump(results, f, indent=4)
+        if ORJSON_AVAILABLE:
+            with open(filepath, "wb") as f:
+                f.write(orjson.dumps(
+                    results, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2
+                ))
+        else:
+            with open(filepath, "w") as f:
+                json.dump(results, f, indent=2, default=_json_default)
     else:
         with open(filepath, "w") as f:
             for key, value in results.items():
@@ -57,6 +101,9 @@ def load_simulation_results(filepath: str) -> Dict[str, Any]:
         Dict[str, Any]: Dicionário com resultados carregados.
     """
     try:
+        if ORJSON_AVAILABLE:
+            with open(filepath, "rb") as f:
+                return orjson.loads(f.read())
         with open(filepath, "r") as f:
             return json.load(f)
     except Exception as e:
@@ -64,6 +111,49 @@ def load_simulation_results(filepath: str) -> Dict[str, Any]:
         return {}
 
 
+_PARAMS_KEY = "__params__"
+
+
+def load_or_generate_arrays(
+    filepath: str,
+    generate_fn: Callable[[], Dict[str, np.ndarray]],
+    params: Optional[Dict[str, Any]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Carrega arrays de um arquivo .npz ou os gera e persiste na primeira vez.
+
+    Guardar o estado inicial em disco torna as execuções seguintes
+    reprodutíveis mesmo que o gerador aleatório do NumPy mude de versão.
+    Os parâmetros de geração são gravados junto com os arrays; se o arquivo
+    foi gerado com parâmetros diferentes, os arrays são gerados de novo.
+
+    Args:
+        filepath (str): Caminho do arquivo .npz.
+        generate_fn (Callable[[], Dict[str, np.ndarray]]): Função que gera
+            os arrays (nome -> array) quando o arquivo não existe.
+        params (Optional[Dict[str, Any]]): Parâmetros usados por generate_fn
+            (serializáveis em JSON). O arquivo só é reaproveitado se foi
+            gerado com os mesmos parâmetros.
+
+    Returns:
+        Dict[str, np.ndarray]: Arrays carregados ou recém-gerados.
+    """
+    expected = json.dumps(params or {}, sort_keys=True)
+
+    if os.path.exists(filepath):
+        # .npz é um zip: não há mmap, então lê tudo e fecha o arquivo
+        with np.load(filepath) as data:
+            stored = str(data[_PARAMS_KEY]) if _PARAMS_KEY in data.files else None
+            if stored == expected:
+                return {name: data[name] for name in data.files if name != _PARAMS_KEY}
+        print(f"Parâmetros de {filepath} mudaram: regerando arrays")
+
+    arrays = generate_fn()
+    os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+    np.savez_compressed(filepath, **arrays, **{_PARAMS_KEY: np.array(expected)})
+    return arrays
+
+
 def print_banner(text: str, char: str = "=") -> None:
     """
     Imprime um banner com texto.